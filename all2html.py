@@ -1,165 +1,272 @@
 # Imports
-import numpy as np
-import pandas as pd
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from conlang import open_lexicon, file_hash
+from collation import alphabet, letter_groups, collation_order, first_letters
+from render import Template, origin_cells
+from genealogy import Genealogy
+# External (numpy, pandas) are only imported when a page has to be rebuilt
+
+# Initialise Parser
+parser = argparse.ArgumentParser(description='Lexicon Webpage Builder')
+parser.add_argument('-force', action='store_true', help='Rebuild all pages, even if their inputs are unchanged')
+parser.add_argument('-shard', type=str, choices=['letter', 'page'], default=None,
+                    help='Split lexicon pages into shards per letter or per page, with an index page and search index')
+parser.add_argument('-size', type=int, default=500, help='Entries per shard when sharding per page')
+parser.add_argument('-jobs', type=int, default=1, help='Number of processes rendering pages')
+
+# Output directory and build manifest (input hash and output file hashes per page)
+out_dir = '../../Webpage/public_html/tables'
+manifest_path = os.path.join(out_dir, 'all2html.manifest.json')
+
+# Lexicons (code, path)
+lex_dic = {
+    'IS' : './data/iskeelis.tsv',
+    'EVO' : './data/evolved.tsv',
+    'FAU' : './data/hlaahu.tsv'
+}
+
+def load(code):
+    '''RETURNS LEXICON WITH EMPTY CELLS AS SPACES, AND ITS COLLATION KEYS'''
+    import numpy as np
+    lex, codes = open_lexicon(lex_dic[code], code, collation=True)
+    return lex.replace(np.nan, ' ', regex=True), codes
+
 
 # ------------------------------------------------------------------------------
 # LEXICON PRINTER
 # ------------------------------------------------------------------------------
-# Lex modes
-lex_modes = ['lex', 'evo']
-
-# Defined order of the alphabet
-alphabet = ['a', 'á', 'b', 'c', 'd', 'e', 'é', 'f', 'g', 'h', 'i', 'í', 'j', 'k', 'l', 'hl',
-            'm', 'n', 'o', 'ó', 'p', 'q', 'r', 's', 'sh', 't', 'tl', 'ch', 'u', 'v',
-            'w', 'x', 'y', 'z']
-
-for mode in lex_modes:
-    # Import the correct lexicon.csv using Pandas
-    if mode == 'lex':
-        lex = pd.read_csv('./data/iskeelis.tsv', delimiter='\t')
-        f = open('../../Webpage/public_html/tables/ISKlist.html', 'wb')
-    elif mode == 'evo':
-        lex = pd.read_csv('./data/evolved.tsv', delimiter='\t')
-        f = open('../../Webpage/public_html/tables/EVOlist.html', 'wb')
-    else:
-        raise ValueError('Type not recognised, please use lex or evo.')
-    lex = lex.replace(np.nan, ' ', regex=True)
-
-    # Print table
-    f.write(b'<table class="tg" style="undefined;table-layout: fixed; width: 903px">')
-    f.write(b'<colgroup>')
-    f.write(b'<col style="width: 301px">')
-    f.write(b'<col style="width: 301px">')
-    f.write(b'<col style="width: 301px">')
-    f.write(b'</colgroup>')
-    f.write(b'<tbody>')
-    # For each letter in the alphabet
-    for i in range(len(alphabet)):
-        if alphabet[i] == 'c':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 'c') &
-                         (lex['Orthography'].astype(str).str[1] != 'h')]
-        elif alphabet[i] == 'h':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 'h') &
-                         (lex['Orthography'].astype(str).str[1] != 'l')]
-        elif alphabet[i] == 'hl':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 'h') &
-                         (lex['Orthography'].astype(str).str[1] == 'l')]
-        elif alphabet[i] == 's':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 's') &
-                         (lex['Orthography'].astype(str).str[1] != 'h')]
-        elif alphabet[i] == 'sh':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 's') &
-                         (lex['Orthography'].astype(str).str[1] == 'h')]
-        elif alphabet[i] == 't':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 't') &
-                         (lex['Orthography'].astype(str).str[1] != 'l')]
-        elif alphabet[i] == 'tl':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 't') &
-                         (lex['Orthography'].astype(str).str[1] == 'l')]
-        elif alphabet[i] == 'ch':
-            sublex = lex[(lex['Orthography'].astype(str).str[0] == 'c') &
-                         (lex['Orthography'].astype(str).str[1] == 'h')]
-        else:
-            sublex = lex[lex['Orthography'].astype(str).str[0] == alphabet[i]]
-
-        # Sort sublex
-        sublex = sublex.sort_values('Orthography')
-
-        # Print section
-        if len(sublex.index) != 0:
-            f.write(b'<tr>')
-            f.write('<td class="tg-wp8o" colspan="3">{0}</td>'.format(alphabet[i]).encode('ascii', 'xmlcharrefreplace'))
-            f.write(b'</tr>')
-
-            j = 0
-            # Print according entries
-            for index, entry in sublex.iterrows():
-                if j % 3 == 0:
-                    f.write(b'<tr>')
-                f.write('<td class="tg-73oq"><span style="font-weight:bold;color:#1d77a8">{0}</span> [{1}]<br>    <span style="font-style:italic">{2}.</span> {3}</td>'
-                        .format(entry['Orthography'].replace('.', ''), entry['IPA'], entry['Class'], entry['Description'].lower()).encode('ascii', 'xmlcharrefreplace'))
-                if j % 3 == 2:
-                    f.write(b'</tr>')
-                j += 1
-
-    f.write(b'</tbody>')
-    f.write(b'</table>')
-    # Close file
-    f.close()
+# Lexicon per letter
+list_template = Template('<td class="tg-73oq"><span style="font-weight:bold;color:#1d77a8">{Orthography|nodot}</span> [{IPA}]<br>'
+                         '    <span style="font-style:italic">{Class}.</span> {Description|lower}</td>',
+                         head='<table class="tg" style="undefined;table-layout: fixed; width: 903px"><colgroup>'
+                              '<col style="width: 301px"><col style="width: 301px"><col style="width: 301px">'
+                              '</colgroup><tbody>',
+                         section='<tr><td class="tg-wp8o" colspan="3">{0}</td></tr>',
+                         per_line=3, line_open='<tr>', line_close='</tr>',
+                         foot='</tbody></table>', encoding='xml')
+
+
+def render_list(lex, codes):
+    '''RETURNS HTML TABLE OF LEXICON, GROUPED PER LETTER'''
+    return list_template.render(letter_groups(lex, codes=codes))
+
 
 # ------------------------------------------------------------------------------
 # HLAAHU PRINTER
 # ------------------------------------------------------------------------------
-# Import lexicon.csv using Pandas
-lex = pd.read_csv('./data/hlaahu.tsv',delimiter='\t')
-lex = lex.replace(np.nan, ' ', regex=True)
-
-evo_modes = ['OG', 'NG']
-
-for mode in evo_modes:
+def fau_rows(lex, codes, mode):
+    '''RETURNS POSITIONS OF OG OR NG HLAAHU, SORTED ON NAME (BY COLLATION KEY)'''
+    order = collation_order(codes)
     if mode == 'OG':
-        cut_lex = lex[lex['NG'] == ' ']
-        f = open('../../Webpage/public_html/tables/OGlist.html', 'wb')
+        return order[lex['NG'].to_numpy()[order] == ' ']
     elif mode == 'NG':
-        cut_lex = lex[lex['NG'] != ' ']
-        f = open('../../Webpage/public_html/tables/NGlist.html', 'wb')
+        return order[lex['NG'].to_numpy()[order] != ' ']
     else:
         raise ValueError('Type not recognised, please use OG or NG.')
 
-    # Sort on Orthography
-    lexsrt = cut_lex.sort_values('Name')
-
-    # Print HTML table for list view
-    # Print header
-    f.write(b'<table id="tg-peUr8" class="tg">')
-    f.write(b'<thead>')
-    f.write(b'  <tr>')
-    f.write('    <th class="tg-6t95">Hláhu</th>'.encode('ascii', 'xmlcharrefreplace'))
-    if type == 'NG':
-        f.write(b'    <th class="tg-6t95">Origin</th>')
-    f.write(b'    <th class="tg-6t95">Name</th>')
-    f.write('    <th class="tg-6t95">Nerlé</th>'.encode('ascii', 'xmlcharrefreplace'))
-    f.write('    <th class="tg-6t95">Óle</th>'.encode('ascii', 'xmlcharrefreplace'))
-    f.write(b'    <th class="tg-ru17">Description</th>')
-    f.write(b'    <th class="tg-6t95">Evo. Name</th>')
-    f.write(b'    <th class="tg-6t95">Evo. Nerle</th>')
-    f.write('    <th class="tg-6t95">Evo. Ól</th>'.encode('ascii', 'xmlcharrefreplace'))
-    f.write(b'  </tr>')
-    f.write(b'</thead>')
-    # Print body
-    f.write(b'<tbody>')
-    for index, entry in lexsrt.iterrows():
-        # f.write(bindex)
-        f.write(b'  <tr>')
-        f.write('    <td class="tg-baqh"><img src="../img/hlaahu/{0:03}.png" alt="Image" width="100" height="100"></td>'.format(int(entry['NO.'])).encode('ascii', 'xmlcharrefreplace'))
-        if type == 'NG':
-            e1, e2 = entry['NG'].split(', ')
-            f.write('    <td class="tg-baqh"><img src="../img/hlaahu/{0:03}.png" alt="Image" width="60" height="60"><img src="../img/hlaahu/{1:03}.png" alt="Image" width="60" height="60"></td>'
-                    .format(int(lex[lex['Name'] == e1].iloc[0]['NO.']), int(lex[lex['Name'] == e2].iloc[0]['NO.'])).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-baqh">{}</td>'.format(entry['Name']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-5frq">{}</td>'.format(entry['Nerlé']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-5frq">{}</td>'.format(entry['Óle']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-0lax">{}</td>'.format(entry['Description']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-baqh">{}</td>'.format(entry['Evo. Name']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-5frq">{}</td>'.format(entry['Evo. Nerle']).encode('ascii', 'xmlcharrefreplace'))
-        f.write('    <td class="tg-5frq">{}</td>'.format(entry['Evo. Ól']).encode('ascii', 'xmlcharrefreplace'))
-        f.write(b'  </tr>')
-    f.write(b'</tbody>')
-    f.write(b'</table>')
-    # Close file
-    f.close()
+
+def fau_cut(lex, codes, mode):
+    '''RETURNS OG OR NG HLAAHU, SORTED ON NAME (BY COLLATION KEY)'''
+    return lex.iloc[fau_rows(lex, codes, mode)]
+
+
+def fau_template(origin=False):
+    '''RETURNS TEMPLATE OF HLAAHU TABLE (WITH ORIGIN COLUMN IF ASKED)'''
+    return Template('  <tr>'
+                    '    <td class="tg-baqh"><img src="../img/hlaahu/{NO.|int:03}.png" alt="Image" width="100" height="100"></td>' +
+                    ('    <td class="tg-baqh">{Origin}</td>' if origin else '') +
+                    '    <td class="tg-baqh">{Name}</td>'
+                    '    <td class="tg-5frq">{Nerlé}</td>'
+                    '    <td class="tg-5frq">{Óle}</td>'
+                    '    <td class="tg-0lax">{Description}</td>'
+                    '    <td class="tg-baqh">{Evo. Name}</td>'
+                    '    <td class="tg-5frq">{Evo. Nerle}</td>'
+                    '    <td class="tg-5frq">{Evo. Ól}</td>'
+                    '  </tr>',
+                    head='<table id="tg-peUr8" class="tg"><thead>  <tr>    <th class="tg-6t95">Hláhu</th>' +
+                         ('    <th class="tg-6t95">Origin</th>' if origin else '') +
+                         '    <th class="tg-6t95">Name</th>    <th class="tg-6t95">Nerlé</th>    <th class="tg-6t95">Óle</th>'
+                         '    <th class="tg-ru17">Description</th>    <th class="tg-6t95">Evo. Name</th>'
+                         '    <th class="tg-6t95">Evo. Nerle</th>    <th class="tg-6t95">Evo. Ól</th>  </tr></thead><tbody>',
+                    foot='</tbody></table>', encoding='xml')
+
+
+def render_fau(lex, codes, mode, origin=False):
+    '''RETURNS HTML TABLE OF OG OR NG HLAAHU (WITH ORIGIN COLUMN IF ASKED)'''
+    lexsrt = fau_cut(lex, codes, mode)
+    if origin:
+        genealogy = Genealogy(lex)
+        for problem in genealogy.problems():
+            print(problem)
+        lexsrt = lexsrt.assign(Origin=origin_cells(genealogy, lexsrt['Name']))
+    return fau_template(origin).render([(None, lexsrt)])
+
 
 # ------------------------------------------------------------------------------
 # BLOCK PRINTER
 # ------------------------------------------------------------------------------
-    if mode == 'OG':
-        f = open('../../Webpage/public_html/tables/FAUblock.html', 'wb')
-        f.write(b'<h2>List of Hl&#225;hu of Isk&#233;lis</h2>')
-    elif mode == 'NG':
-        f = open('../../Webpage/public_html/tables/FAUblock.html', 'ab')
-        f.write(b'<h2>List of New Generation combinations</h2>')
-    # Print all images for block view
-    for index, entry in lexsrt.iterrows():
-        f.write('  <img src="../img/hlaahu/{0:03}.png" width="100" height="100">'.format(int(entry['NO.'])).encode('ascii', 'xmlcharrefreplace'))
-    # Close file
-    f.close()
+# Image blocks, one section per generation
+block_template = Template('  <img src="../img/hlaahu/{NO.|int:03}.png" width="100" height="100">',
+                          section='{0}', encoding='xml')
+
+
+def render_block(lex, codes):
+    '''RETURNS IMAGE BLOCKS OF OG AND NG HLAAHU'''
+    return block_template.render([('<h2>List of Hl&#225;hu of Isk&#233;lis</h2>', fau_cut(lex, codes, 'OG')),
+                                  ('<h2>List of New Generation combinations</h2>', fau_cut(lex, codes, 'NG'))])
+
+
+# ------------------------------------------------------------------------------
+# BUILD PIPELINE
+# ------------------------------------------------------------------------------
+# Pages (file name, lexicon code, renderer)
+page_dic = {
+    'ISKlist.html' : ('IS', render_list),
+    'EVOlist.html' : ('EVO', render_list),
+    'OGlist.html' : ('FAU', partial(render_fau, mode='OG')),
+    'NGlist.html' : ('FAU', partial(render_fau, mode='NG')),
+    'FAUblock.html' : ('FAU', render_block)
+}
+
+# Title of shards of entries not starting with a letter
+other = '#'
+
+# Pages that can be sharded (file name, entries in page order, search index columns)
+shard_dic = {
+    'ISKlist.html' : (lambda lex, codes: collation_order(codes), ['Orthography', 'IPA', 'Description']),
+    'EVOlist.html' : (lambda lex, codes: collation_order(codes), ['Orthography', 'IPA', 'Description']),
+    'OGlist.html' : (partial(fau_rows, mode='OG'), ['Name', 'Description']),
+    'NGlist.html' : (partial(fau_rows, mode='NG'), ['Name', 'Description'])
+}
+
+
+def split_rows(firsts, labels, shard='letter', size=500):
+    '''RETURNS LIST OF (TITLE, START, END) SHARDS OF PAGE ENTRIES, PER FIRST LETTER OR PER SIZE ENTRIES'''
+    import numpy as np
+    if shard == 'letter':
+        # Entries not starting with a letter (sorted before or after the alphabet) go in catch-all shards
+        bounds = np.r_[0, np.flatnonzero(np.diff(firsts)) + 1, len(firsts)]
+        return [(alphabet[firsts[start]] if firsts[start] >= 0 else other, start, end)
+                for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+    elif shard == 'page':
+        if size < 1:
+            raise ValueError('Page size must be positive.')
+        return [('{} – {}'.format(labels[start], labels[min(start + size, len(labels)) - 1]), start, start + size)
+                for start in range(0, len(labels), size)]
+    else:
+        raise ValueError('Shard mode not recognised, please use letter or page.')
+
+
+def shard_page(name, lex, codes, shard='letter', size=500):
+    '''RETURNS RENDER JOBS (FILE NAME, SUB-LEXICON, SUB-KEYS) OF SHARDS, AND THE INDEX PAGE AND SEARCH INDEX'''
+    import numpy as np
+    select, columns = shard_dic[name]
+    # Entries in page order, every shard is a slice of them
+    rows = select(lex, codes)
+    page, keys = lex.iloc[rows], codes[rows]
+    shards = split_rows(first_letters(keys), page[columns[0]].tolist(), shard, size)
+    base = name[:-len('.html')]
+    files = ['{}-{:03}.html'.format(base, i + 1) for i in range(len(shards))]
+    jobs = [(file, page.iloc[start:end], keys[start:end]) for file, (title, start, end) in zip(files, shards)]
+    # Index page, linking every shard (with its number of entries)
+    parts = ['<ul class="tg-index" data-search="{}.json">'.format(base)]
+    parts += ['<li><a href="{}">{}</a> ({})</li>'.format(file, title, len(keys[start:end]))
+              for file, (title, start, end) in zip(files, shards)]
+    parts.append('</ul>')
+    index = ''.join(parts).encode('ascii', 'xmlcharrefreplace')
+    # Compact search index (columns of every entry, with the number of its shard)
+    sub = np.concatenate([np.arange(start, min(end, len(keys))) for title, start, end in shards] or [np.arange(0)])
+    cols = [page[column].to_numpy()[sub].tolist() for column in columns]
+    cols.append(np.repeat(np.arange(len(shards)), [len(keys[start:end]) for title, start, end in shards]).tolist())
+    search = json.dumps({'shards' : files, 'columns' : columns, 'entries' : list(map(list, zip(*cols)))},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return jobs, {name : index, base + '.json' : search}
+
+
+def load_manifest():
+    '''RETURNS BUILD MANIFEST, EMPTY IF MISSING'''
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_page(name, html):
+    '''WRITES PAGE IN ONE BUFFERED WRITE'''
+    with open(os.path.join(out_dir, name), 'wb') as f:
+        f.write(html)
+
+
+def page_current(entry, inputs):
+    '''RETURNS WHETHER ALL FILES OF A MANIFEST ENTRY ARE BUILT FROM INPUTS AND UNCHANGED'''
+    files = entry.get('files')
+    if entry.get('inputs') != inputs or not files:
+        return False
+    return all(os.path.exists(os.path.join(out_dir, file)) and file_hash(os.path.join(out_dir, file)) == digest
+               for file, digest in files.items())
+
+
+async def build(force=False, shard=None, size=500, jobs=1):
+    '''RENDERS AND WRITES ALL PAGES (OR THEIR SHARDS) WHOSE INPUTS CHANGED, CONCURRENTLY'''
+    manifest = load_manifest()
+    # Inputs of a page are its lexicon, this script and the modules it renders with (and the sharding of shardable pages)
+    script = ':'.join(file_hash(os.path.join(os.path.dirname(os.path.abspath(__file__)), module + '.py'))
+                      for module in ['all2html', 'render', 'collation', 'conlang', 'genealogy'])
+    layout = '{}:{}'.format(shard, size if shard == 'page' else '') if shard else ''
+    lex_hashes = {code : file_hash(path) for code, path in lex_dic.items()}
+    inputs = {name : '{}:{}'.format(script, lex_hashes[code]) + (':' + layout if layout and name in shard_dic else '')
+              for name, (code, render_page) in page_dic.items()}
+    stale = [name for name in page_dic if force or not page_current(manifest.get(name, {}), inputs[name])]
+    if not stale:
+        print('All pages up to date.')
+        return
+    # Load every needed lexicon once
+    codes = sorted(set(page_dic[name][0] for name in stale))
+    lexs = dict(zip(codes, await asyncio.gather(*(asyncio.to_thread(load, code) for code in codes))))
+    # Render and write pages (or shards) concurrently, over a process pool if asked
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    async def make(file, render_page, *args):
+        html = await loop.run_in_executor(pool, render_page, *args)
+        await asyncio.to_thread(write_page, file, html)
+        return file, html
+    try:
+        # Tasks of all stale pages first, so every page (and shard) renders concurrently
+        pages = {}
+        for name in stale:
+            code, render_page = page_dic[name]
+            if shard and name in shard_dic:
+                tasks, extra = shard_page(name, *lexs[code], shard, size)
+                tasks = [make(file, render_page, sublex, subcodes) for file, sublex, subcodes in tasks]
+            else:
+                tasks, extra = [make(name, render_page, *lexs[code])], {}
+            pages[name] = (tasks, extra)
+        extras = [(file, html) for tasks, extra in pages.values() for file, html in extra.items()]
+        await asyncio.gather(*(asyncio.to_thread(write_page, file, html) for file, html in extras))
+        results = await asyncio.gather(*(asyncio.gather(*tasks) for tasks, extra in pages.values()))
+        for (name, (tasks, extra)), result in zip(pages.items(), results):
+            built = dict(result, **extra)
+            # Remove shards of an earlier build that are not part of this one
+            for file in manifest.get(name, {}).get('files', {}):
+                if file not in built and os.path.exists(os.path.join(out_dir, file)):
+                    os.remove(os.path.join(out_dir, file))
+            manifest[name] = {'inputs' : inputs[name],
+                              'files' : {file : file_hash(os.path.join(out_dir, file)) for file in built}}
+            print('Built {} ({} files, {} bytes)'.format(name, len(built), sum(map(len, built.values()))))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    # Save manifest
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    asyncio.run(build(args.force, args.shard, args.size, args.jobs))
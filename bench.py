@@ -0,0 +1,247 @@
+# Imports
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from conlang import Transcriber, read_lexicon, open_lexicon, csv_engine, load_index, search_lexicon, insert_tsv
+from collation import collation_key, collation_order, letter_groups
+from render import list_templates
+from genealogy import Genealogy
+from phonology import phoneme_stats, PackedWords, get_inventory
+from generator import WordModel, generate
+from neighbours import phoneme_rows, near_pairs, edit_distance, minimal_pairs
+
+# Initialise Parser
+parser = argparse.ArgumentParser(description='Lexicon Benchmarks')
+# Mode Parameters
+parser.add_argument('type', type=str, action='store', metavar='benchmark',
+                    help='Benchmark to run: load, store, search, collate, render, origin, anl, packed, gen, dup, mpairs')
+parser.add_argument('-n', type=int, nargs='+', default=[10000, 100000, 1000000], help='Lexicon sizes')
+# Return 'help' information if parsing not succesful
+try:
+    args = parser.parse_args()
+except TypeError:
+    parser.print_help()
+# Parser variables
+type  = args.type
+sizes = args.n
+
+# Bundled lexicons used as seed for synthetic ones
+seed_dic = {
+    'IS' : './data/iskeelis.tsv',
+    'EVO' : './data/evolved.tsv',
+    'FAU' : './data/hlaahu.tsv'
+}
+
+
+def synthetic(code, n, path):
+    '''WRITES LEXICON OF N ROWS BY REPEATING THE BUNDLED ONE'''
+    lex = pd.read_csv(seed_dic[code], sep='\t')
+    lex.iloc[np.arange(n) % len(lex)].to_csv(path, sep='\t', index=False)
+
+
+def timed(func, repeat=3):
+    '''RETURNS BEST WALL TIME OF FUNCTION OVER REPEATS'''
+    best = np.inf
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# Load times of the old python engine parser against read_lexicon
+if type == 'load':
+    print('read_lexicon engine: {}'.format(csv_engine()))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            for code in seed_dic:
+                path = os.path.join(tmp, '{}_{}.tsv'.format(code, n))
+                synthetic(code, n, path)
+                t_old = timed(lambda: pd.read_csv(path, sep=r'\t', engine='python'), 1 if n >= 1000000 else 3)
+                t_new = timed(lambda: read_lexicon(path, code))
+                print('{:>3} {:>8} rows | python engine {:7.3f} s | read_lexicon {:7.3f} s | {:5.1f}x'
+                      .format(code, n, t_old, t_new, t_old / t_new))
+# Load times of read_lexicon against the memory-mapped store
+elif type == 'store':
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            for code in seed_dic:
+                path = os.path.join(tmp, '{}_{}.tsv'.format(code, n))
+                synthetic(code, n, path)
+                t_build = timed(lambda: open_lexicon(path, code), 1)
+                t_tsv = timed(lambda: read_lexicon(path, code))
+                t_map = timed(lambda: open_lexicon(path, code))
+                print('{:>3} {:>8} rows | build {:7.3f} s | read_lexicon {:7.3f} s | open_lexicon {:7.3f} s | {:5.1f}x'
+                      .format(code, n, t_build, t_tsv, t_map, t_tsv / t_map))
+# Query times of column scans against the search index
+elif type == 'search':
+    queries = [('Orthography', 'xen.tu', 'exact'), ('Orthography', 'tla', 'prefix'), ('Orthography', 'ka.ta', 'sub'),
+               ('Description', 'sun', 'sub'), ('IPA', 'tɬ', 'seg')]
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'IS_{}.tsv'.format(n))
+            synthetic('IS', n, path)
+            lex = open_lexicon(path, 'IS')
+            t0 = time.perf_counter()
+            for axis, search, match in queries:
+                search_lexicon(path, lex, axis, search, match)
+            print('{:>8} rows | index build {:7.3f} s'.format(n, time.perf_counter() - t0))
+            columns = load_index(path)['columns']
+            for axis, search, match in queries:
+                t_scan = timed(lambda: lex[lex[axis].str.lower().str.contains(search.lower())])
+                t_index = timed(lambda: getattr(columns[axis], match)(search))
+                print('{:>8} rows | {:>11} {:>6} {:>8} | str.contains {:8.3f} ms | index {:8.3f} ms'
+                      .format(n, axis, match, search, t_scan * 1e3, t_index * 1e3))
+# Sorting by collation key (tuples against cached keys) and sorted insertion against a full resort
+elif type == 'collate':
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'IS_{}.tsv'.format(n))
+            synthetic('IS', n, path)
+            lex, codes = open_lexicon(path, 'IS', collation=True)
+            words = lex['Orthography'].tolist()
+            t_tuple = timed(lambda: sorted(range(n), key=lambda i: collation_key(words[i])), 1)
+            t_codes = timed(lambda: collation_order(open_lexicon(path, 'IS', collation=True)[1]))
+            print('{:>8} rows | tuple keys {:7.3f} s | stored keys + argsort {:7.3f} s'.format(n, t_tuple, t_codes))
+            # Sort the file once, then insert against rewriting it sorted
+            lex.iloc[collation_order(codes)].to_csv(path, sep='\t', index=False)
+            open_lexicon(path, 'IS', collation=True)
+            entry = {'Orthography' : 'ká.ba', 'IPA' : 'kaː.ba', 'Stress' : -2, 'Hláhu' : 'kába', 'Age' : 0,
+                     'Class' : 'n', 'Description' : 'bench'}
+            t_insert = timed(lambda: insert_tsv(path, [entry]), 1)
+            t_resort = timed(lambda: lex.iloc[collation_order(codes)].to_csv(path, sep='\t', index=False), 1)
+            print('{:>8} rows | insert_tsv {:7.3f} s | full rewrite {:7.3f} s'.format(n, t_insert, t_resort))
+# Rendering per letter with iterrows against the streaming templates
+elif type == 'render':
+    def iterrows_html(groups):
+        parts = ['<table class="tg" style="undefined;table-layout: fixed; width: 903px">', '<colgroup>',
+                 '<col style="width: 301px">', '<col style="width: 301px">', '<col style="width: 301px">',
+                 '</colgroup>', '<tbody>']
+        for letter, sublex in groups:
+            parts += ['<tr>', '<td class="tg-wp8o" colspan="3">{0}</td>'.format(letter), '</tr>']
+            j = 0
+            for index, entry in sublex.iterrows():
+                if j % 3 == 0:
+                    parts.append('<tr>')
+                parts.append('<td class="tg-73oq"><span style="font-weight:bold;color:#3166FF">{0}</span> [{1}]<br>    <span style="font-style:italic">{2}.</span> {3}</td>'
+                             .format(entry['Orthography'], entry['IPA'], entry['Class'], entry['Description'].lower()))
+                if j % 3 == 2:
+                    parts.append('</tr>')
+                j += 1
+        parts += ['</tbody>', '</table>']
+        return ''.join(parts).encode('utf-8')
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'IS_{}.tsv'.format(n))
+            synthetic('IS', n, path)
+            lex, codes = open_lexicon(path, 'IS', collation=True)
+            groups = letter_groups(lex.replace(np.nan, ' ', regex=True), codes=codes)
+            t_rows = timed(lambda: iterrows_html(groups), 1)
+            t_html = timed(lambda: list_templates['html'].render(groups))
+            print('{:>8} rows | iterrows html {:7.3f} s | template html {:7.3f} s | {:5.1f}x'
+                  .format(n, t_rows, t_html, t_rows / t_html))
+            for target in ['latex', 'markdown', 'json']:
+                t_target = timed(lambda: list_templates[target].render(groups))
+                print('{:>8} rows | template {:>8} {:7.3f} s'.format(n, target, t_target))
+# NG parent lookup by boolean scans against the name index
+elif type == 'origin':
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'FAU_{}.tsv'.format(n))
+            synthetic('FAU', n, path)
+            lex = open_lexicon(path, 'FAU')
+            ng = lex[lex['NG'].notna()]
+            # Scans are timed on a sample of NG entries and scaled up
+            sample = ng['NG'].tolist()[:500]
+            def scan():
+                for parents in sample:
+                    e1, e2 = [name.strip() for name in parents.split(',')]
+                    lex[lex['Name'] == e1].iloc[0]['NO.'], lex[lex['Name'] == e2].iloc[0]['NO.']
+            t_scan = timed(scan, 1) * len(ng) / len(sample)
+            t_index = timed(lambda: Genealogy(lex).origins(ng['Name']))
+            print('{:>8} rows | {:>7} NG | boolean scans {:9.3f} s | name index {:7.3f} s | {:7.1f}x'
+                  .format(n, len(ng), t_scan, t_index, t_scan / t_index))
+# Phoneme statistics by character counting over iterrows against the segmented, vectorized engine
+elif type == 'anl':
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'IS_{}.tsv'.format(n))
+            synthetic('IS', n, path)
+            lex = open_lexicon(path, 'IS')
+            def chars():
+                phons = []
+                for index, series in lex.iterrows():
+                    phons += list(series['IPA'])
+                return np.unique(phons, return_counts=True)
+            t_chars = timed(chars, 1)
+            t_stats = timed(lambda: phoneme_stats(lex['IPA']))
+            print('{:>8} rows | iterrows characters {:7.3f} s | phoneme_stats {:7.3f} s | {:5.1f}x'
+                  .format(n, t_chars, t_stats, t_chars / t_stats))
+# Memory and transcription time of lists of str against packed phoneme codes
+elif type == 'packed':
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            path = os.path.join(tmp, 'IS_{}.tsv'.format(n))
+            synthetic('IS', n, path)
+            lex = open_lexicon(path, 'IS')
+            transcriber = Transcriber('IS')
+            orthos = lex['Orthography'].tolist()
+            ipas = transcriber.transcribe_many(orthos)
+            packed = PackedWords.from_words(ipas, get_inventory('IS'))
+            size = sys.getsizeof(ipas) + sum(sys.getsizeof(ipa) for ipa in ipas)
+            print('{:>8} rows | list of str {:8.1f} MB | packed {:8.1f} MB | {:5.1f}x'
+                  .format(n, size / 2**20, packed.nbytes / 2**20, size / packed.nbytes))
+            t_list = timed(lambda: transcriber.transcribe_many(orthos))
+            t_packed = timed(lambda: transcriber.transcribe_packed(orthos))
+            print('{:>8} rows | transcribe_many {:7.3f} s | transcribe_packed {:7.3f} s'.format(n, t_list, t_packed))
+# Candidate sampling rate and the full generator (collision filtering, evolution, IPA and stress)
+elif type == 'gen':
+    lex = pd.read_csv(seed_dic['IS'], sep='\t')
+    model = WordModel(lex['Orthography'].tolist())
+    for n in sizes:
+        t_sample = timed(lambda: model.sample(n))
+        t_gen = timed(lambda: generate(lex, n), 1)
+        print('{:>8} candidates | sample {:7.3f} s ({:6.2f} M/s) | generate {:7.3f} s'
+              .format(n, t_sample, n / t_sample / 1e6, t_gen))
+# Near-homophones by comparing all pairs against the deletion neighbourhood index (distinct generated words)
+elif type == 'dup':
+    lex = pd.read_csv(seed_dic['IS'], sep='\t')
+    model = WordModel(lex['Orthography'].tolist())
+    transcriber = Transcriber('IS')
+    for n in sizes:
+        words = list(dict.fromkeys(model.sample(2 * n, 0).tolist()))[:n]
+        rows, lengths, inventory = phoneme_rows(transcriber.transcribe_many(words))
+        # All pairs are timed for a sample of words and scaled up
+        sample = np.arange(min(100, len(words)))
+        def pairwise():
+            for i in sample:
+                edit_distance(np.repeat(rows[i:i+1], len(rows), axis=0), np.repeat(lengths[i:i+1], len(rows)),
+                              rows, lengths, 1)
+        t_pairs = timed(pairwise, 1) * len(words) / len(sample) / 2
+        t_index = timed(lambda: near_pairs(rows, lengths, 1), 1)
+        print('{:>8} words | all pairs {:9.3f} s | deletion index {:7.3f} s | {:7.1f}x | {} near pairs'
+              .format(len(words), t_pairs, t_index, t_pairs / t_index, len(near_pairs(rows, lengths, 1)[0])))
+# Minimal pairs by comparing all pairs of equal length against wildcard hashing (distinct generated words)
+elif type == 'mpairs':
+    lex = pd.read_csv(seed_dic['IS'], sep='\t')
+    model = WordModel(lex['Orthography'].tolist())
+    transcriber = Transcriber('IS')
+    for n in sizes:
+        words = list(dict.fromkeys(model.sample(2 * n, 0).tolist()))[:n]
+        rows, lengths, inventory = phoneme_rows(transcriber.transcribe_many(words))
+        # All pairs are timed for a sample of words and scaled up
+        sample = np.arange(min(100, len(words)))
+        def pairwise():
+            for i in sample:
+                ((rows != rows[i]).sum(axis=1) == 1) & (lengths == lengths[i])
+        t_pairs = timed(pairwise, 1) * len(words) / len(sample) / 2
+        t_hash = timed(lambda: minimal_pairs(rows, lengths), 1)
+        print('{:>8} words | all pairs {:9.3f} s | wildcard hashing {:7.3f} s | {:7.1f}x | {} minimal pairs'
+              .format(len(words), t_pairs, t_hash, t_pairs / t_hash, len(minimal_pairs(rows, lengths)[0])))
+else:
+    raise ValueError('Benchmark not recognised, please use load, store, search, collate, render, origin, anl, packed, gen, '
+                     'dup or mpairs.')
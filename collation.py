@@ -0,0 +1,72 @@
+# Imports
+import re
+from conlang import LRUCache, cached_many
+# External (numpy) is only imported by the lexicon-wide functions that need it
+
+# Defined order of the alphabet (Iskélis graphemes)
+alphabet = ['a', 'á', 'b', 'c', 'd', 'e', 'é', 'f', 'g', 'h', 'i', 'í', 'j', 'k', 'l', 'hl',
+            'm', 'n', 'o', 'ó', 'p', 'q', 'r', 's', 'sh', 't', 'tl', 'ch', 'u', 'v',
+            'w', 'x', 'y', 'z']
+
+# Position of every grapheme in the alphabet
+alphabet_dic = {grapheme : i for i, grapheme in enumerate(alphabet)}
+
+# Graphemes (digraphs before single letters, anything else as a single character)
+grapheme_re = re.compile('|'.join(sorted(alphabet, key=len, reverse=True)) + '|.', re.S)
+
+
+def graphemes(word):
+    '''RETURNS LIST OF GRAPHEMES OF WORD (SYLLABLE BOUNDARIES DROPPED)'''
+    return [grapheme for grapheme in grapheme_re.findall(word.lower()) if grapheme != '.']
+
+
+def collation_key(word):
+    '''RETURNS SORT KEY OF WORD (ALPHABET POSITIONS, UNKNOWN GRAPHEMES AFTER THE ALPHABET)'''
+    return tuple(alphabet_dic[grapheme] if grapheme in alphabet_dic else len(alphabet) + ord(grapheme)
+                 for grapheme in graphemes(word))
+
+
+# Collation keys as bytes (keyed by word)
+key_cache = LRUCache()
+
+
+def collation_bytes(word):
+    '''RETURNS COLLATION KEY OF WORD AS BYTES (3 BIG-ENDIAN BYTES PER GRAPHEME, POSITION + 1)'''
+    return b''.join((code + 1).to_bytes(3, 'big') for code in collation_key(word))
+
+
+def collation_codes(words):
+    '''RETURNS ARRAY OF (CACHED) COLLATION KEYS OF WORDS, SORTABLE WITH A VECTORIZED ARGSORT'''
+    import numpy as np
+    words = [word if isinstance(word, str) else '' for word in words]
+    keys = cached_many(key_cache, words, lambda todo: [collation_bytes(word) for word in todo])
+    # Fixed-width bytes, shorter keys are padded with zero bytes and thus sort before their extensions
+    return np.array(keys, dtype=bytes)
+
+
+def collation_order(codes):
+    '''RETURNS STABLE SORTING ORDER OF COLLATION KEYS'''
+    import numpy as np
+    return np.argsort(codes, kind='stable')
+
+
+def first_letters(codes):
+    '''RETURNS ALPHABET POSITION OF THE FIRST GRAPHEME OF EVERY KEY (-1 IF NOT A LETTER)'''
+    import numpy as np
+    head = np.frombuffer(codes.tobytes(), dtype=np.uint8).reshape(len(codes), codes.itemsize)
+    head = np.pad(head[:, :3], ((0, 0), (0, max(0, 3 - codes.itemsize)))).astype(np.int64)
+    first = (head[:, 0] << 16 | head[:, 1] << 8 | head[:, 2]) - 1
+    return np.where(first < len(alphabet), first, -1)
+
+
+def letter_groups(lex, column='Orthography', codes=None):
+    '''RETURNS LIST OF (LETTER, SUB-LEXICON) IN ALPHABET ORDER, EACH SORTED BY COLLATION KEY'''
+    import numpy as np
+    if codes is None:
+        codes = collation_codes(lex[column])
+    order = collation_order(codes)
+    # First grapheme of every entry, in sorted order (entries not starting with a letter are left out)
+    firsts = first_letters(codes)[order]
+    bounds = np.r_[0, np.flatnonzero(np.diff(firsts)) + 1, len(firsts)]
+    return [(alphabet[firsts[start]], lex.iloc[order[start:end]])
+            for start, end in zip(bounds[:-1], bounds[1:]) if start < end and firsts[start] >= 0]
@@ -0,0 +1,1087 @@
+# Imports
+# Internal
+import csv
+import hashlib
+import io
+import os
+import pickle
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import repeat
+# External (numpy, pandas) are only imported by the lexicon-wide functions that need them
+
+# Path Dictionary
+path_dic = {
+    # Language lexicons
+    'IS' : r'C:/Users/Nika/Python/linguistics-conlang/data/iskeelis.tsv',
+    # Evolved lexicon
+    'EVO' : r'C:/Users/Nika/Python/linguistics-conlang/data/evolved.tsv',
+    # Hláhu/Fauja lexicon
+    'FAU' : r'C:/Users/Nika/Python/linguistics-conlang/data/hlaahu.tsv'
+}
+
+#-------------------------------------------------------------------------------
+# SUPPORT FUNCTIONS
+#-------------------------------------------------------------------------------
+class LRUCache:
+    '''BOUNDED LEAST-RECENTLY-USED CACHE WITH HIT/MISS COUNTERS'''
+
+    def __init__(self, maxsize=2**20):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        '''RETURNS CACHED VALUE (OR DEFAULT) AND COUNTS HIT/MISS'''
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        '''STORES VALUE, DROPPING THE LEAST RECENTLY USED ONE IF FULL'''
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def info(self):
+        '''RETURNS HIT/MISS COUNTERS AND SIZE'''
+        return {'hits' : self.hits, 'misses' : self.misses, 'size' : len(self.data), 'maxsize' : self.maxsize}
+
+
+# Caches (evolution keyed by (word, age_i, age_f, lang), IPA by (ortho, lang), stress by (ipa, lang))
+evo_cache = LRUCache()
+ipa_cache = LRUCache()
+stress_cache = LRUCache()
+missing = object()
+
+
+def cached_many(cache, keys, compute):
+    '''RETURNS CACHED VALUES FOR KEYS, COMPUTING ALL MISSES IN ONE BATCH'''
+    values = [cache.get(key, missing) for key in keys]
+    todo = [i for i, value in enumerate(values) if value is missing]
+    if todo:
+        for i, value in zip(todo, compute([keys[i] for i in todo])):
+            values[i] = value
+            cache.put(keys[i], value)
+    return values
+
+
+# Orthography to IPA tables (per language)
+ipa_dic = {
+    'IS' : {
+        # Digraphs (in order of priority)
+        'digraphs' : [('hl', 'ɬ'), ('tl', 'tɬ'), ('sh', 'ʃ'), ('ch', 'tʃ'), ('dh', 'ð'),
+                      ('au', 'aʊ'), ('eu', 'ɛʊ'), ('ou', 'ɔʊ')],
+        # Single characters
+        'chars' : {'i' : 'ɪ', 'í' : 'i', 'á' : 'aː', 'r' : 'ɾ', 'ŕ' : 'ʀ', 'o' : 'ɔ', 'ó' : 'ɔː',
+                   'e' : 'ɛ', 'é' : 'ɛː', 'q' : 'ɣ', 'w' : 'ʋ', "'" : ''},
+        # Context-sensitive rules (pattern, IPA), applied after the digraphs
+        'rules' : [(r'n(?=\.[ghk])', 'ŋ'),             # /n/ to velar nasal
+                   (r'(?<=[^.])j(?=[^.])', 'ʲ')]        # Parasitic /j/
+    }
+}
+
+
+class Transcriber:
+    '''COMPILED ORTHOGRAPHY TO IPA TRANSDUCER'''
+
+    def __init__(self, lang='IS'):
+        if lang.upper() not in ipa_dic:
+            raise ValueError('Language not recognised.')
+        self.lang = lang.upper()
+        table = ipa_dic[self.lang]
+        self.digraphs = table['digraphs']
+        self.rules = [(re.compile(rule), ipa) for rule, ipa in table['rules']]
+        # Rules for newline separated batches (negated classes never match the newline)
+        self.text_rules = [(re.compile(rule.replace('[^', '[^\n')), ipa) for rule, ipa in table['rules']]
+        self.chars = str.maketrans(table['chars'])
+
+    def transcribe(self, ortho):
+        '''RETURNS IPA FROM ORTHOGRAPHIC INPUT'''
+        # Replace digraphs
+        for graph, ipa in self.digraphs:
+            if graph in ortho:
+                ortho = ortho.replace(graph, ipa)
+        # Apply context-sensitive rules
+        for rule, ipa in self.rules:
+            ortho = rule.sub(ipa, ortho)
+        # Replace single characters
+        return ortho.translate(self.chars)
+
+    def transcribe_many(self, orthos):
+        '''RETURNS LIST OF IPA FROM ITERABLE OF ORTHOGRAPHIC INPUTS'''
+        transcribe = self.transcribe
+        return [transcribe(ortho) for ortho in orthos]
+
+    def transcribe_text(self, text):
+        '''RETURNS IPA OF NEWLINE SEPARATED ORTHOGRAPHIC INPUTS, TRANSCRIBED AS ONE TEXT'''
+        for graph, ipa in self.digraphs:
+            text = text.replace(graph, ipa)
+        for rule, ipa in self.text_rules:
+            text = rule.sub(ipa, text)
+        return text.translate(self.chars)
+
+    def transcribe_packed(self, orthos):
+        '''RETURNS PACKED IPA (PHONEME CODES) OF ORTHOGRAPHIC INPUTS (WORDS OR PACKED ORTHOGRAPHY)'''
+        from phonology import PackedWords, get_inventory
+        text = orthos.text() if isinstance(orthos, PackedWords) else '\n'.join(orthos) + '\n'
+        return PackedWords.from_text(self.transcribe_text(text), get_inventory(self.lang))
+
+    __call__ = transcribe
+
+
+# Transcriber cache (one per language)
+transcribers = {}
+
+
+def get_transcriber(lang='IS'):
+    '''RETURNS (CACHED) TRANSCRIBER FOR LANGUAGE'''
+    if lang.upper() not in transcribers:
+        transcribers[lang.upper()] = Transcriber(lang)
+    return transcribers[lang.upper()]
+
+
+def trans_ipa(ortho, lang='IS', age=0):
+    '''RETURNS IPA FROM ORTHOGRAPHIC INPUT'''
+    key = (ortho, lang.upper())
+    ipa = ipa_cache.get(key, missing)
+    if ipa is missing:
+        ipa = get_transcriber(lang).transcribe(ortho)
+        ipa_cache.put(key, ipa)
+    return ipa
+
+
+def trans_ipa_many(orthos, lang='IS'):
+    '''RETURNS LIST OF IPA FROM ITERABLE OF ORTHOGRAPHIC INPUTS'''
+    keys = [(ortho, lang.upper()) for ortho in orthos]
+    return cached_many(ipa_cache, keys, lambda todo: get_transcriber(lang).transcribe_many(key[0] for key in todo))
+
+
+def find_stress(ipa, lang='IS', age=0):
+    '''RETURNS INDEX OF STRESSED SYLLABLE'''
+    stress = stress_cache.get((ipa, lang.upper()), missing)
+    if stress is not missing:
+        return stress
+    if lang.lower() == 'is':
+        # Split into syllables
+        sylls = ipa.split('.')
+        # One syllable words
+        if len(sylls) == 1:
+            stress = -1
+        # Stress on penultimate syllable, except if final syllable has a long vowel or /i/
+        else:
+            if ('ː' in sylls[-1] or 'i' in sylls[-1]):
+                stress = -1
+            else:
+                stress = -2
+    # Raise error if language code not recognised
+    else:
+        raise ValueError('Language not recognised.')
+    # Return stress index
+    stress_cache.put((ipa, lang.upper()), stress)
+    return stress
+
+
+def find_stress_many(ipas, lang='IS', age=0):
+    '''RETURNS INDICES OF STRESSED SYLLABLES FROM ITERABLE OF IPA INPUTS (ONE SYLLABIFICATION OF THE WHOLE BATCH)'''
+    from phonology import Syllables
+    return Syllables(ipas, lang).stress()
+
+
+def add_stress(nes, lang='IS'):
+    '''SETS STRESS OF ENTRY DICTIONARIES FROM THEIR IPA (SINGLE ENTRIES WITHOUT NUMPY, BATCHES IN ONE SYLLABIFICATION)'''
+    if len(nes) == 1:
+        nes[0]['Stress'] = find_stress(nes[0]['IPA'], lang)
+        return nes
+    for ne, stress in zip(nes, find_stress_many([ne['IPA'] for ne in nes], lang).tolist()):
+        ne['Stress'] = stress
+    return nes
+
+
+# IPA segments (affricates and diphthongs are one segment, length and palatalisation attach to the preceding one)
+ipa_segment = re.compile(r'(?:tɬ|tʃ|aʊ|ɛʊ|ɔʊ|[^.\s])[ːʲ]*')
+
+
+def segment_ipa(ipa):
+    '''RETURNS LIST OF SEGMENTS OF IPA (SYLLABLE BOUNDARIES DROPPED)'''
+    return ipa_segment.findall(ipa)
+
+
+# Phoneme groups (orthographic)
+pg_dic = {
+    'S' : 'aeoui',                  # short vowels
+    'L' : 'áéóí',                   # long vowels (and /i/)
+    'V' : 'aeouiáéóí',              # all vowels
+    'Liq' : 'rljw',                 # liquids
+    'C' : 'qwrtpsdfghjklzxcvbnm'    # all consonants
+}
+
+# Recurring sound change outputs
+voicing = {'p' : 'b', 't' : 'd', 'k' : 'g'}
+devoicing = {'b' : 'p', 'd' : 't', 'g' : 'k'}
+spirants = {'b' : 'v', 'd' : 'dh', 'g' : 'q'}
+shortening = {'á' : 'a', 'é' : 'e', 'ó' : 'o'}
+
+# Sound changes (per evolution path), applied age by age in the listed order
+#   (rule id, age, input, output, left environment, right environment)
+# Inputs and environments are regular expressions over the orthography, in which
+# phoneme groups are written as {S}, {L}, {V}, {Liq} or {C}, '#' marks the word
+# boundary and a leading '!' negates an environment. Outputs are either a template
+# (named groups as \g<name>) or a dictionary keyed by the matched input.
+evo_dic = {
+    'IS' : [
+        # AGE 0
+        ('0.1', 0, 'h', '', '', '!l'),                                      # /h/-dropping
+        ('0.2', 0, r'á\.á', 'á', '', ''),                                   # Vowel hiatus
+        ('0.2', 0, r'á\.a', 'á', '', ''),
+        ('0.2', 0, r'a\.á', 'á', '', ''),
+        ('0.2', 0, r'a\.a', 'á', '', ''),
+        ('0.2', 0, r'é\.é', 'é', '', ''),
+        ('0.2', 0, r'é\.e', 'é', '', ''),
+        ('0.2', 0, r'e\.é', 'é', '', ''),
+        ('0.2', 0, r'e\.e', 'é', '', ''),
+        ('0.2', 0, r'ó\.ó', 'ó', '', ''),
+        ('0.2', 0, r'ó\.o', 'ó', '', ''),
+        ('0.2', 0, r'o\.ó', 'ó', '', ''),
+        ('0.2', 0, r'o\.o', 'ó', '', ''),
+        ('0.2', 0, r'í\.í', 'í', '', ''),
+        ('0.2', 0, r'i\.í', 'ii', '', ''),
+        ('0.2', 0, r'í\.i', 'ji', '', ''),
+        ('0.2', 0, r'\.[ií]', 'i', '[aeouáéó]', ''),
+        ('0.2', 0, r'[ií]\.', 'j', '', '[{V}]'),
+        ('0.2', 0, r'\.', '', '[aeoáéó]', 'u'),
+        ('0.2', 0, r'u\.', 'w', '', '[{V}]'),
+        ('0.2', 0, '[áéó]', shortening, '', '[ui]'),                        # Change notation
+        ('0.3', 0, 'p', 'b', '#', '[{L}]'),                                 # Voicing of initial /p/ before long vowels
+        ('0.4', 0, r'a(?P<c>[{C}])\.', r'á.\g<c>', '', 'j.'),               # Parasitic /j/
+        ('0.4', 0, r'e(?P<c>[{C}])\.', r'é.\g<c>', '', 'j.'),
+        ('0.4', 0, r'o(?P<c>[{C}])\.', r'ó.\g<c>', '', 'j.'),
+        ('0.4', 0, r'i(?P<c>[{C}])\.', r'í.\g<c>', '', 'j.'),
+        # AGE 1
+        ('1.1', 1, '[ptk]', voicing, r'[{V}]\.', '[{V}]'),                  # Intervocalic voicing of voiceless stops
+        ('1.1', 1, '[ptk]', voicing, '[{V}]', r'\.[{V}]'),
+        ('1.2', 1, '[ptk]', voicing, r'[mn]\.', ''),                        # Voicing of stops in nasal cluster
+        ('1.2', 1, '[ptk]', voicing, '', r'\.[mn]'),
+        ('1.3', 1, '', 'k', r'[eé]\.', '[{V}]'),                            # Further vowel hiatus (epenthetic /k/)
+        # AGE 2
+        ('2.1', 2, 'n', 'm', '', r'\.[pb]'),                                # Nasal assimilation
+        ('2.1', 2, 'n', 'm', r'[pb]\.', ''),
+        ('2.2', 2, '[ptk]', r'\g<c>', '', r'\.(?P<c>[ptk])'),               # Gemination of voiceless stop clusters
+        ('2.3', 2, 's', 'z', r'!s\.', '[áéó]'),                             # Voicing of /s/ preceding long vowels
+        ('2.4', 2, 'j', 'x', '![{C}]', '[uíi]'),                            # /ju/ -> /xu/
+        # AGE 3
+        ('3.1', 3, 'tj', 'ch', '', ''),                                     # Palatalisation of tj, sj, tí, kí, sí
+        ('3.1', 3, 't', 'ch', '', '[íi]'),
+        ('3.1', 3, 'sj', 'sh', '', ''),
+        ('3.1', 3, 's', 'sh', '', '[íi]'),
+        ('3.1', 3, 'kj?', 'ch', r'!k\.', '[éeíi]'),
+        ('3.2', 3, '[bdg]', spirants, r'[{V}]\.', '[{V}]'),                 # Intervocalic spirantisation of voiced stops
+        ('3.2', 3, '[bdg]', spirants, '[{V}]', r'\.[{V}]'),
+        ('3.3', 3, '[ptk]', voicing, r'[{V}]\.', '[{V}]'),                  # Intervocalic voicing of voiceless stops
+        ('3.3', 3, '[ptk]', voicing, '[{V}]', r'\.[{V}]'),
+        # AGE 4
+        ('4.1', 4, 'p', 'f', '#', '[{S}{Liq}]'),                            # Spirantisation of word initial /p/
+        ('4.2', 4, r'\.(?P<c>[^.rw])[{S}]', r'\g<c>', '[^{C}.]', '#'),      # Loss of word-final short vowels
+        ('4.2', 4, r'\.[{S}]', '', '[^{C}.].', '#'),
+        ('4.3', 4, '[áéó]', shortening, r'\..*', '#'),                      # Shortening of word-final long vowels
+        ('4.4', 4, 'í', 'i', r'\..*', '#'),                                 # Centralisation of word-final í /i/
+        ('4.5', 4, '[bdg]', devoicing, '', '#'),                            # Devoicing of word-final stops
+        ('4.6', 4, 's', '', '..', '#')                                      # Dropping of word-final /s/ (unless word too short)
+    ]
+}
+
+
+class SoundChange:
+    '''COMPILED SOUND CHANGE RULE'''
+
+    def __init__(self, rule_id, age, inp, out, left='', right=''):
+        self.id = rule_id
+        self.age = age
+        self.out = out
+        # Build pattern, using a look-behind for the left environment where possible
+        # (negated classes never match the newline separating words in a batch)
+        inp, left, right = [re.sub(r'\{(\w+)\}', lambda m: pg_dic[m.group(1)], x).replace('[^', '[^\n')
+                            for x in (inp, left, right)]
+        inp = '(?P<inp>{})'.format(inp)
+        if right:
+            right = '(?{}{})'.format('!' if right[0] == '!' else '=', right.lstrip('!').replace('#', '$'))
+        self.keep_left = False
+        if left:
+            sign = '!' if left[0] == '!' else '='
+            left = left.lstrip('!').replace('#', '^')
+            try:
+                self.pattern = re.compile('(?<{}{}){}{}'.format(sign, left, inp, right), re.M)
+            except re.error: # Variable-width environment, match and keep it instead
+                self.pattern = re.compile('(?P<left>{}){}{}'.format(left, inp, right), re.M)
+                self.keep_left = True
+        else:
+            self.pattern = re.compile(inp + right, re.M)
+        # Plain templates are substituted directly
+        if isinstance(out, str) and not self.keep_left:
+            self.repl = out
+        else:
+            self.repl = self._replace
+
+    def _replace(self, match):
+        if isinstance(self.out, dict):
+            new = self.out[match.group('inp')]
+        else:
+            new = match.expand(self.out)
+        if self.keep_left:
+            new = match.group('left') + new
+        return new
+
+    def apply(self, word):
+        '''RETURNS WORD WITH SOUND CHANGE APPLIED'''
+        return self.pattern.sub(self.repl, word)
+
+
+class Evolver:
+    '''COMPILED SOUND CHANGE PATH'''
+
+    def __init__(self, lang='IS'):
+        if lang.upper() not in evo_dic:
+            raise ValueError('Evolution path not recognised.')
+        self.lang = lang.upper()
+        self.rules = sorted([SoundChange(*rule) for rule in evo_dic[self.lang]], key=lambda rule: rule.age)
+        self.ages = sorted(set(rule.age for rule in self.rules))
+
+    def evolve(self, word, age_i=0, age_f=99):
+        '''RETURNS EVOLVED WORD'''
+        for rule in self.rules:
+            if age_i <= rule.age <= age_f:
+                word = rule.apply(word)
+        return word
+
+    def evolve_many(self, words, age_i=0, age_f=99):
+        '''RETURNS LIST OF EVOLVED WORDS FROM ITERABLE OF WORDS'''
+        words = list(words)
+        # One evolved word per word (also for empty words), none for no words
+        return self.evolve_text('\n'.join(words), age_i, age_f).split('\n') if words else []
+
+    def evolve_text(self, text, age_i=0, age_f=99):
+        '''RETURNS EVOLVED NEWLINE SEPARATED WORDS (EVERY RULE APPLIED ONCE TO THE WHOLE TEXT)'''
+        for rule in self.rules:
+            if age_i <= rule.age <= age_f:
+                text = rule.apply(text)
+        return text
+
+    def evolve_packed(self, words, age_i=0, age_f=99):
+        '''RETURNS PACKED EVOLVED ORTHOGRAPHY OF PACKED ORTHOGRAPHY'''
+        from phonology import PackedWords
+        return PackedWords.from_text(self.evolve_text(words.text(), age_i, age_f), words.inventory)
+
+    def sweep_many(self, words, age_i=0, age_f=99):
+        '''RETURNS DICTIONARY OF EVOLVED WORD LISTS FOR EVERY AGE'''
+        sweep = {}
+        for age in self.ages:
+            if age_i <= age <= age_f:
+                words = self.evolve_many(words, age, age)
+                sweep[age] = words
+        return sweep
+
+
+# Evolver cache (one per evolution path)
+evolvers = {}
+
+
+def get_evolver(lang='IS'):
+    '''RETURNS (CACHED) EVOLVER FOR EVOLUTION PATH'''
+    if lang.upper() not in evolvers:
+        evolvers[lang.upper()] = Evolver(lang)
+    return evolvers[lang.upper()]
+
+
+def evolver(entry, age_i, age_f, lang='IS'):
+    '''RETURNS EVOLVED ENTRY'''
+    key = (entry, age_i, age_f, lang.upper())
+    word = evo_cache.get(key, missing)
+    if word is missing:
+        word = get_evolver(lang).evolve(entry, age_i, age_f)
+        evo_cache.put(key, word)
+    return word
+
+
+# Minimum number of words worth starting a process pool for
+min_parallel = 10000
+
+
+def _evolve_chunk(words, age_i, age_f, lang, sweep):
+    '''RETURNS EVOLVED CHUNK OF WORDS (POOL WORKER)'''
+    if sweep:
+        return get_evolver(lang).sweep_many(words, age_i, age_f)
+    return get_evolver(lang).evolve_many(words, age_i, age_f)
+
+
+def evolve_words(words, age_i, age_f, lang='IS', jobs=1, sweep=False):
+    '''RETURNS EVOLVED WORDS (PER AGE IF SWEEP), SHARDED OVER JOBS PROCESSES'''
+    words = list(words)
+    if sweep:
+        return _evolve_pool(words, age_i, age_f, lang, jobs, sweep)
+    # Only evolve words not already in the cache
+    keys = [(word, age_i, age_f, lang.upper()) for word in words]
+    return cached_many(evo_cache, keys, lambda todo: _evolve_pool([key[0] for key in todo], age_i, age_f, lang, jobs))
+
+
+def _evolve_pool(words, age_i, age_f, lang='IS', jobs=1, sweep=False):
+    '''RETURNS EVOLVED WORDS (PER AGE IF SWEEP), SHARDED OVER JOBS PROCESSES'''
+    # Serial for small inputs
+    if jobs <= 1 or len(words) < min_parallel:
+        return _evolve_chunk(words, age_i, age_f, lang, sweep)
+    # Shard into a few chunks per process
+    size = -(-len(words) // (4 * jobs))
+    chunks = [words[i:i+size] for i in range(0, len(words), size)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(_evolve_chunk, chunks, repeat(age_i), repeat(age_f), repeat(lang), repeat(sweep)))
+    # Stitch chunks back together in input order
+    if sweep:
+        return {age : [word for res in results for word in res[age]] for age in results[0]}
+    return [word for res in results for word in res]
+
+
+def rules_hash():
+    '''RETURNS HASH OF THE TRANSCRIPTION AND SOUND CHANGE RULES'''
+    return hashlib.sha1(repr((ipa_dic, pg_dic, evo_dic)).encode('utf-8')).hexdigest()
+
+
+def load_cache(path):
+    '''LOADS EVOLUTION AND IPA CACHES FROM FILE, UNLESS THE RULES CHANGED SINCE'''
+    try:
+        with open(path, 'rb') as f:
+            stored = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return False
+    if stored.get('hash') != rules_hash():
+        return False
+    for key, value in stored['evo']:
+        evo_cache.put(key, value)
+    for key, value in stored['ipa']:
+        ipa_cache.put(key, value)
+    return True
+
+
+def save_cache(path):
+    '''SAVES EVOLUTION AND IPA CACHES TO FILE'''
+    stored = {
+        'hash' : rules_hash(),
+        'evo' : list(evo_cache.data.items()),
+        'ipa' : list(ipa_cache.data.items())
+    }
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def save_tsv(lex, path):
+    '''WRITES LEXICON TO TSV, REPLACING THE OLD FILE ATOMICALLY'''
+    lex.to_csv(path + '.tmp', sep='\t', index=False)
+    os.replace(path + '.tmp', path)
+
+
+#-------------------------------------------------------------------------------
+# LEXICON FILES
+#-------------------------------------------------------------------------------
+# Lexicon schemas (column dtypes, categorical for low-cardinality columns)
+schema_dic = {
+    'IS' : {'Orthography' : str, 'IPA' : str, 'Stress' : 'Int8', 'Hláhu' : str, 'Age' : 'category',
+            'Class' : 'category', 'Description' : str},
+    'EVO' : {'Orthography' : str, 'IPA' : str, 'Stress' : 'Int8', 'Hláhu' : str, 'Age' : 'category',
+             'Class' : 'category', 'Description' : str, 'Changed' : 'category', 'OG IPA' : str, 'OG Ortho' : str},
+    'FAU' : {'NO.' : 'Int32', 'Name' : str, 'Nerlé' : str, 'Óle' : str, 'Description' : str,
+             'Evo. Name' : str, 'Evo. Nerle' : str, 'Evo. Ól' : str, 'NG' : str}
+}
+
+
+# Language code aliases (per lexicon)
+lang_dic = {
+    'IS' : ['is', 'isk', 'iskélis', 'iskeelis'],
+    'FAU' : ['hl', 'hlá', 'hla', 'hláhu', 'fau', 'fauja'],
+    'EVO' : ['evo', 'evolved', 'evolve']
+}
+
+
+def lang_code(lang):
+    '''RETURNS LEXICON CODE (IS, EVO, FAU) OF LANGUAGE CODE ALIAS'''
+    for code, aliases in lang_dic.items():
+        if lang.lower() in aliases:
+            return code
+    raise ValueError('Language code not recognised.')
+
+
+def lex_code(path):
+    '''RETURNS LEXICON CODE (IS, EVO, FAU) OF PATH'''
+    for code, lex_path in path_dic.items():
+        if path == lex_path:
+            return code
+    return None
+
+
+def csv_engine():
+    '''RETURNS FASTEST AVAILABLE PANDAS CSV ENGINE'''
+    try:
+        import pyarrow
+        return 'pyarrow'
+    except ImportError:
+        return 'c'
+
+
+def read_lexicon(path, code=None):
+    '''RETURNS LEXICON FROM TSV, TYPED ACCORDING TO ITS SCHEMA'''
+    import pandas as pd
+    try:
+        return pd.read_csv(path, sep='\t', dtype=schema_dic.get(code or lex_code(path)), engine=csv_engine())
+    except:
+        raise ValueError('Error loading CSV.')
+
+
+def store_path(path):
+    '''RETURNS PATH OF THE COMPILED (ARROW) STORE OF A LEXICON'''
+    return os.path.splitext(path)[0] + '.arrow'
+
+
+def file_hash(path):
+    '''RETURNS SHA1 HASH OF FILE CONTENTS'''
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def tsv_stamp(path):
+    '''RETURNS STAMP (MTIME, SIZE, SHA1) OF TSV'''
+    stat = os.stat(path)
+    return {'mtime' : str(stat.st_mtime_ns), 'size' : str(stat.st_size), 'sha1' : file_hash(path)}
+
+
+def stamp_current(path, stamp):
+    '''CHECKS IF STAMP STILL DESCRIBES TSV, HASHING IT ONLY IF IT WAS TOUCHED WITHOUT CHANGING SIZE'''
+    stat = os.stat(path)
+    if stamp.get('size') != str(stat.st_size):
+        return False
+    return stamp.get('mtime') == str(stat.st_mtime_ns) or stamp.get('sha1') == file_hash(path)
+
+
+# Column each lexicon is collated (sorted) on
+collation_dic = {'IS' : 'Orthography', 'EVO' : 'Orthography', 'FAU' : 'Name'}
+
+
+def lexicon_codes(lex, code=None):
+    '''RETURNS COLLATION KEYS OF LEXICON (OF ITS ORTHOGRAPHY, OR NAME FOR HLAAHU)'''
+    from collation import collation_codes
+    column = collation_dic.get(code, 'Orthography' if 'Orthography' in lex.columns else 'Name')
+    return collation_codes(lex[column])
+
+
+def build_store(path, code=None):
+    '''COMPILES TSV LEXICON TO ITS ARROW STORE, RETURNS LEXICON AND ITS COLLATION KEYS'''
+    import pyarrow as pa
+    stamp = tsv_stamp(path)
+    lex = read_lexicon(path, code)
+    table = pa.Table.from_pandas(lex, preserve_index=False)
+    # Precomputed collation keys (fixed-width binary, read back zero-copy)
+    codes = lexicon_codes(lex, code)
+    keys = pa.FixedSizeBinaryArray.from_buffers(pa.binary(codes.itemsize), len(codes), [None, pa.py_buffer(codes)])
+    table = table.append_column('Collation', keys)
+    # Stamp of the TSV the store was compiled from
+    meta = dict(table.schema.metadata or {})
+    meta.update({key.encode() : value.encode() for key, value in stamp.items()})
+    table = table.replace_schema_metadata(meta)
+    # Uncompressed IPC file so it can be memory-mapped, written atomically
+    store = store_path(path)
+    tmp = store + '.tmp'
+    try:
+        with pa.OSFile(tmp, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, store)
+    except OSError:
+        # Read-only directory or store mapped by another process, the TSV remains the source of truth
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return lex, codes
+
+
+def open_lexicon(path, code=None, collation=False):
+    '''RETURNS LEXICON (AND ITS COLLATION KEYS) FROM ITS MEMORY-MAPPED STORE, REBUILT WHENEVER THE TSV HAS CHANGED'''
+    import numpy as np
+    code = code or lex_code(path)
+    try:
+        import pyarrow as pa
+    except ImportError:
+        pa = None
+    if pa is None or not os.path.isfile(path):
+        lex = read_lexicon(path, code)
+        return (lex, lexicon_codes(lex, code)) if collation else lex
+    try:
+        table = pa.ipc.open_file(pa.memory_map(store_path(path))).read_all()
+        # Rebuild if the TSV changed since the store was compiled
+        meta = {key.decode() : value.decode() for key, value in (table.schema.metadata or {}).items()}
+        if 'Collation' not in table.column_names or not stamp_current(path, meta):
+            table = None
+    except (OSError, pa.ArrowInvalid):
+        table = None
+    if table is None:
+        lex, codes = build_store(path, code)
+    else:
+        lex = table.drop_columns(['Collation']).to_pandas()
+        keys = table.column('Collation').combine_chunks()
+        codes = np.frombuffer(keys.buffers()[1], dtype='S{}'.format(keys.type.byte_width),
+                              count=len(keys), offset=keys.offset * keys.type.byte_width)
+    return (lex, codes) if collation else lex
+
+
+def make_entry(path, entry, stress=True):
+    '''RETURNS ENTRY DICTIONARY FROM ALL-IN-ONE ENTRY (STRESS LEFT TO ADD_STRESS IF NOT STRESS)'''
+    if path == path_dic["IS"]:
+        # Split entry parameter
+        ortho, fauja, age, type, desc = entry.split(':')
+        # Get IPA
+        ipa = trans_ipa(ortho, lang='IS', age=age)
+        # Create entry dictionary
+        ne = {
+            'Orthography' : ortho,
+            'IPA' : ipa,
+            'Stress' : find_stress(ipa, lang='IS', age=age) if stress else None,
+            'Hláhu' : fauja,
+            'Age' : age,
+            'Class' : type,
+            'Description' : desc
+        }
+
+    elif path == path_dic["FAU"]:
+        # Split entry parameter
+        number, namedot, desc, ngstat = entry.split(':')
+        # Get syllables
+        if '.' not in namedot:
+            namedot += '. '
+        sylls = namedot.lower().split('.')
+        # Get evolved word
+        evoname = evolver(namedot, 0, 9, lang="IS")
+        if '.' not in evoname:
+            evoname += '. '
+        evosylls = evoname.split('.')
+        # Get NGstat
+        if ngstat == '':
+            ngstat = ' '
+        # Create entry dictionary
+        ne = {
+            'NO.' : int(number),
+            'Name' : namedot.replace('.', '').replace(' ', ''),
+            'Nerlé' : sylls[0],
+            'Óle' : ', '.join(sylls[1:]),
+            'Description' : desc,
+            'Evo. Name' : evoname.replace('.', '').replace(' ', ''),
+            'Evo. Nerle' : evosylls[0],
+            'Evo. Ól' : ', '.join(evosylls[1:]),
+            'NG' : ngstat
+        }
+
+    # Raise error if lexicon does not take entries
+    else:
+        raise ValueError('Entries can only be added to the IS and FAU lexicons.')
+    return ne
+
+
+def read_entries(path):
+    '''RETURNS ALL-IN-ONE ENTRIES FROM FILE (ONE PER LINE)'''
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\r\n') for line in f if line.strip() and not line.startswith('#')]
+
+
+@contextmanager
+def locked(path, mode='ab+'):
+    '''OPENS FILE UNDER AN EXCLUSIVE LOCK'''
+    f = open(path, mode)
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield f
+    finally:
+        if os.name == 'nt':
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+
+
+# Lexicon headers already validated (per path)
+checked_headers = set()
+
+
+def append_tsv(path, rows):
+    '''APPENDS ROWS (DICTIONARIES) TO TSV IN A SINGLE WRITE'''
+    columns = list(rows[0].keys())
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter='\t', lineterminator='\n')
+    writer.writerows([[row[col] for col in columns] for row in rows])
+    with locked(path) as f:
+        f.seek(0, os.SEEK_END)
+        # Start new lexicon with header
+        if f.tell() == 0:
+            data = '\t'.join(columns) + '\n' + buf.getvalue()
+        else:
+            # Check header once
+            if path not in checked_headers:
+                f.seek(0)
+                header = f.readline().decode('utf-8').rstrip('\r\n').split('\t')
+                if header != columns:
+                    raise ValueError('Lexicon header {} does not match entry.'.format(header))
+                checked_headers.add(path)
+            # Terminate last line if needed
+            f.seek(-1, os.SEEK_END)
+            data = buf.getvalue() if f.read(1) == b'\n' else '\n' + buf.getvalue()
+        f.write(data.encode('utf-8'))
+
+
+def insert_tsv(path, rows):
+    '''INSERTS ROWS (DICTIONARIES) INTO TSV IN COLLATION ORDER, MERGING THEM INTO THE SORTED FILE'''
+    import numpy as np
+    from collation import collation_codes, collation_order
+    columns = list(rows[0].keys())
+    column = collation_dic.get(lex_code(path), 'Orthography' if 'Orthography' in columns else 'Name')
+    # New rows in collation order
+    new_codes = collation_codes([row[column] for row in rows])
+    new_order = collation_order(new_codes)
+    # Start new lexicon by appending
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return append_tsv(path, [rows[i] for i in new_order])
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter='\t', lineterminator='\n')
+    writer.writerows([[rows[i][col] for col in columns] for i in new_order])
+    new_lines = buf.getvalue().encode('utf-8').splitlines(keepends=True)
+    # Keys of the existing rows, taken from the store if it still describes the file
+    try:
+        stamp = tsv_stamp(path)
+        lex, old_codes = open_lexicon(path, collation=True)
+    except (OSError, ValueError):
+        stamp, old_codes = None, None
+    with locked(path, 'rb+') as f:
+        lines = f.read().splitlines(keepends=True)
+        header = lines[0].decode('utf-8').rstrip('\r\n').split('\t')
+        if header != columns:
+            raise ValueError('Lexicon header {} does not match entry.'.format(header))
+        body = lines[1:]
+        if stamp is None or not stamp_current(path, stamp) or len(old_codes) != len(body):
+            col = header.index(column)
+            old_codes = collation_codes([line.decode('utf-8').rstrip('\r\n').split('\t')[col] for line in body])
+        # Sort the file once if it is not sorted yet
+        resorted = len(body) > 1 and bool((old_codes[1:] < old_codes[:-1]).any())
+        if resorted:
+            order = collation_order(old_codes)
+            body, old_codes = [body[i] for i in order], old_codes[order]
+        # Insertion points, the file is only rewritten from the first one on
+        pos = np.searchsorted(old_codes, new_codes[new_order], side='right')
+        first = 0 if resorted else int(pos[0])
+        # Terminate last line if needed
+        if body and not body[-1].endswith(b'\n'):
+            first = min(first, len(body) - 1)
+            body[-1] += b'\n'
+        merged = [] if (body or lines[0].endswith(b'\n')) else [b'\n']
+        prev = first
+        for p, line in zip(pos, new_lines):
+            merged += body[prev:p]
+            merged.append(line)
+            prev = p
+        merged += body[prev:]
+        f.seek(len(lines[0]) + sum(len(line) for line in body[:first]))
+        f.truncate()
+        f.write(b''.join(merged))
+
+
+#-------------------------------------------------------------------------------
+# SEARCH
+#-------------------------------------------------------------------------------
+# Search types (exact, prefix, substring or IPA segment sequence)
+search_matches = ['exact', 'prefix', 'sub', 'seg']
+# Longest n-gram in the inverted index, shorter queries are answered by their posting list alone
+max_gram = 3
+# Combining diacritics (after NFD decomposition)
+combining = re.compile('[\u0300-\u036f]')
+
+
+def fold(text):
+    '''RETURNS LOWERCASE TEXT WITHOUT DIACRITICS'''
+    return combining.sub('', unicodedata.normalize('NFD', text.lower()))
+
+
+def fold_many(values):
+    '''RETURNS SERIES OF FOLDED TEXTS'''
+    import pandas as pd
+    values = pd.Series(values, dtype=object).fillna('').astype(str)
+    return values.str.lower().str.normalize('NFD').str.replace(combining.pattern, '', regex=True)
+
+
+def radix_order(codes):
+    '''RETURNS STABLE SORTING ORDER OF NON-NEGATIVE INTEGER CODES (BELOW 2**32)'''
+    import numpy as np
+    codes = np.asarray(codes, dtype=np.int64)
+    # Stable uint16 sorts are radix sorts, so sort by low and then by high half
+    order = np.argsort((codes & 0xffff).astype(np.uint16), kind='stable')
+    if codes.size and codes.max() > 0xffff:
+        order = order[np.argsort((codes[order] >> 16).astype(np.uint16), kind='stable')]
+    return order
+
+
+def gram_key(gram):
+    '''RETURNS INTEGER KEY OF N-GRAM (CODE POINTS PACKED IN 21 BITS EACH)'''
+    return sum(ord(char) << (21 * (max_gram - 1 - j)) for j, char in enumerate(gram))
+
+
+class GramIndex:
+    '''INVERTED N-GRAM INDEX OVER A LIST OF TEXTS'''
+
+    def __init__(self, texts):
+        import numpy as np
+        import pandas as pd
+        # Texts as one NUL-separated string and its code points
+        self.size = len(texts)
+        self.joined = ''.join(text + '\0' for text in texts)
+        cps = np.frombuffer(self.joined.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=self.size)
+        self.starts = np.r_[0, np.cumsum(lengths + 1)]
+        row_of = np.repeat(np.arange(self.size, dtype=np.int32), lengths + 1)
+        # Keys of all n-grams not crossing a text boundary
+        padded = np.r_[cps, np.zeros(max_gram, dtype=np.int64)]
+        keys, rows = [], []
+        for n in range(1, max_gram + 1):
+            key = np.zeros(len(cps), dtype=np.int64)
+            inside = np.ones(len(cps), dtype=bool)
+            for j in range(n):
+                char = padded[j:j + len(cps)]
+                key |= char << (21 * (max_gram - 1 - j))
+                inside &= char != 0
+            keys.append(key[inside])
+            rows.append(row_of[inside])
+        keys, rows = np.concatenate(keys), np.concatenate(rows)
+        # Posting lists (compressed sparse rows), sorted by key and then by row
+        codes, uniques = pd.factorize(keys)
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[np.argsort(uniques)] = np.arange(len(uniques))
+        codes = rank[codes]
+        order = radix_order(codes)
+        codes, rows = codes[order], rows[order]
+        new = np.r_[True, (np.diff(codes) != 0) | (np.diff(rows) != 0)]
+        codes, self.rows = codes[new], rows[new]
+        self.keys = np.sort(np.asarray(uniques, dtype=np.int64))
+        self.offsets = np.searchsorted(codes, np.arange(len(self.keys) + 1))
+
+    def text(self, row):
+        '''RETURNS TEXT OF ROW'''
+        return self.joined[self.starts[row]:self.starts[row + 1] - 1]
+
+    def posting(self, gram):
+        '''RETURNS SORTED ROWS CONTAINING N-GRAM'''
+        import numpy as np
+        key = gram_key(gram)
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return np.empty(0, dtype=np.int32)
+        return self.rows[self.offsets[i]:self.offsets[i + 1]]
+
+    def search(self, query):
+        '''RETURNS SORTED ROWS CONTAINING QUERY'''
+        import numpy as np
+        if query == '':
+            return np.arange(self.size, dtype=np.int32)
+        if len(query) <= max_gram:
+            return self.posting(query)
+        # Intersect posting lists, smallest first, then verify the candidates
+        grams = {query[k:k + max_gram] for k in range(len(query) - max_gram + 1)}
+        lists = sorted((self.posting(gram) for gram in grams), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return np.array([row for row in rows if query in self.text(row)], dtype=np.int32)
+
+
+class SearchIndex:
+    '''SORTED-KEY, N-GRAM AND SEGMENT INDEX OVER ONE LEXICON COLUMN'''
+
+    def __init__(self, values):
+        import numpy as np
+        folded = fold_many(values)
+        self.size = len(folded)
+        self.text = GramIndex(folded.tolist())
+        # Sorted keys (exact and prefix queries by bisection)
+        self.order = np.asarray(folded.argsort(kind='stable'), dtype=np.int32)
+        # Segment index (built on first segment query)
+        self.segs = None
+
+    def build_segments(self, values):
+        '''INDEXES IPA SEGMENTS OF VALUES, EACH SEGMENT ENCODED AS ONE PRIVATE-USE CHARACTER'''
+        segs = [segment_ipa(value) if isinstance(value, str) else [] for value in values]
+        self.seg_chars = {}
+        for seg in set().union(*segs):
+            self.seg_chars[seg] = chr(0xe000 + len(self.seg_chars))
+        self.segs = GramIndex([''.join(map(self.seg_chars.get, seg)) for seg in segs])
+
+    def bisect(self, query, hi_query=None):
+        '''RETURNS SORTED ROWS WHOSE KEY LIES BETWEEN QUERY AND HI_QUERY (OR EQUALS QUERY)'''
+        import numpy as np
+        lo = bisect_left(self.order, query, key=self.text.text)
+        if hi_query is None:
+            hi = bisect_right(self.order, query, key=self.text.text)
+        else:
+            hi = bisect_left(self.order, hi_query, key=self.text.text)
+        return np.sort(self.order[lo:hi])
+
+    def exact(self, query):
+        '''RETURNS ROWS EQUAL TO QUERY'''
+        return self.bisect(fold(query))
+
+    def prefix(self, query):
+        '''RETURNS ROWS STARTING WITH QUERY'''
+        return self.bisect(fold(query), fold(query) + '\U0010ffff')
+
+    def sub(self, query):
+        '''RETURNS ROWS CONTAINING QUERY'''
+        return self.text.search(fold(query))
+
+    def seg(self, query):
+        '''RETURNS ROWS CONTAINING THE IPA SEGMENT SEQUENCE OF QUERY'''
+        import numpy as np
+        segs = segment_ipa(query)
+        if not all(seg in self.seg_chars for seg in segs):
+            return np.empty(0, dtype=np.int32)
+        return self.segs.search(''.join(map(self.seg_chars.get, segs)))
+
+    def query(self, search, match='sub', values=None):
+        '''RETURNS ROWS MATCHING SEARCH, BUILDING THE SEGMENT INDEX FROM VALUES IF NEEDED'''
+        if match not in search_matches:
+            raise ValueError('Search type not recognised, please use exact, prefix, sub or seg.')
+        if match == 'seg' and self.segs is None:
+            self.build_segments(values)
+        return getattr(self, match)(search)
+
+
+def index_path(path):
+    '''RETURNS PATH OF THE SEARCH INDEX OF A LEXICON'''
+    return os.path.splitext(path)[0] + '.idx'
+
+
+def load_index(path):
+    '''RETURNS SEARCH INDEX OF LEXICON, EMPTY IF MISSING OR OUT OF DATE'''
+    try:
+        with open(index_path(path), 'rb') as f:
+            index = pickle.load(f)
+        if stamp_current(path, index['stamp']):
+            return index
+    except Exception:
+        pass
+    return {'stamp' : tsv_stamp(path), 'columns' : {}}
+
+
+def save_index(path, index):
+    '''SAVES SEARCH INDEX OF LEXICON (ATOMICALLY)'''
+    tmp = index_path(path) + '.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, index_path(path))
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def search_lexicon(path, lex, axis, search, match='sub'):
+    '''RETURNS ENTRIES OF LEXICON WHOSE AXIS MATCHES SEARCH, USING THE PERSISTENT SEARCH INDEX'''
+    if axis not in lex.columns:
+        raise ValueError('Search axis not recognised.')
+    # Build missing column indexes and save them for later searches
+    index = load_index(path)
+    column = index['columns'].get(axis)
+    built = column is None or (match == 'seg' and column.segs is None)
+    if column is None:
+        column = index['columns'][axis] = SearchIndex(lex[axis])
+    rows = column.query(search, match, lex[axis])
+    if built:
+        save_index(path, index)
+    return lex.iloc[rows]
+
+
+#-------------------------------------------------------------------------------
+# LEXICON FUNCTIONS
+#-------------------------------------------------------------------------------
+def evolve_lexicon(lex, lang, age_f, jobs=1, sweep=False):
+    '''RETURNS EVOLVED LEXICON'''
+    import pandas as pd
+    ortho = lex['Orthography'].astype(str)
+    ages = lex['Age'].astype(int)
+    # Intermediate ages to keep
+    sweep_cols = ['Ortho {}'.format(age) for age in get_evolver(lang).ages if age <= age_f] if sweep else []
+    # Evolve every unique (orthography, age) pair once
+    uni = pd.DataFrame({'Orthography' : ortho, 'Age' : ages}).drop_duplicates()
+    for col in ['New'] + sweep_cols:
+        uni[col] = ''
+    for age, group in uni.groupby('Age'):
+        new = evolve_words(group['Orthography'], int(age), age_f, lang, jobs, sweep)
+        if sweep:
+            forms = list(group['Orthography'])
+            for col in sweep_cols:
+                forms = new.get(int(col.split()[-1]), forms)
+                uni.loc[group.index, col] = forms
+            new = forms
+        uni.loc[group.index, 'New'] = new
+    uni = uni.set_index(['Orthography', 'Age']).reindex(pd.MultiIndex.from_arrays([ortho, ages]))
+    uni.index = lex.index
+    new = uni['New']
+    # Transcribe every unique (evolved or original) orthography once
+    forms = pd.unique(pd.concat([new, ortho]))
+    ipa_map = dict(zip(forms, trans_ipa_many(forms, lang)))
+    ipa_new = new.map(ipa_map)
+    # Build evolved lexicon
+    evolex = lex.assign(**{
+        'Orthography' : new,                                    # Evolved orthography
+        'IPA' : ipa_new,                                        # Evolved IPA
+        'Stress' : find_stress_many(ipa_new, lang),             # Stress
+        'Age' : ages,                                           # Final age
+        'Changed' : (new != ortho).astype(str),                 # Changed (boolean string)
+        'OG IPA' : ortho.map(ipa_map),                          # Original IPA
+        'OG Ortho' : ortho                                      # Original orthography
+    }, **{col : uni[col] for col in sweep_cols})                # Intermediate orthographies
+    return evolex
+
+
+def evolve_incremental(lex, evolex, lang, age_f, jobs=1, sweep=False):
+    '''RETURNS EVOLVED LEXICON, ONLY EVOLVING ENTRIES MISSING FROM A PREVIOUS EVOLVED LEXICON'''
+    import pandas as pd
+    # Entries are matched on original orthography and all other source columns
+    cols = [col for col in lex.columns if col not in ['IPA', 'Stress']]
+    new_keys = pd.MultiIndex.from_frame(lex[cols].fillna('').astype(str))
+    old_keys = pd.MultiIndex.from_frame(evolex[['OG Ortho'] + cols[1:]].fillna('').astype(str))
+    unique = ~old_keys.duplicated()
+    evolex, old_keys = evolex[unique], old_keys[unique]
+    pos = old_keys.get_indexer(new_keys)
+    # Reuse unchanged entries, evolve added or changed ones (removed ones are dropped)
+    todo = pos < 0
+    kept = evolex.iloc[pos[~todo]].set_axis(lex.index[~todo])
+    if not todo.any():
+        # Nothing to evolve (evolve_lexicon is not run on an empty lexicon)
+        print('\nNo added/changed entries, reused {}.'.format(len(kept)))
+        return kept.loc[lex.index, list(evolex.columns)]
+    fresh = evolve_lexicon(lex[todo], lang, age_f, jobs, sweep)
+    print('\nEvolved {} added/changed entries, reused {}.'.format(len(fresh), len(kept)))
+    return pd.concat([kept, fresh]).loc[lex.index, list(evolex.columns)]
+
+
+def evo_stamp(lang, age_f, sweep):
+    '''RETURNS SIGNATURE OF THE SETTINGS AN EVOLVED LEXICON IS BUILT WITH'''
+    return '{} {} {} {}'.format(rules_hash(), lang.upper(), age_f, sweep)
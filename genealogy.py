@@ -0,0 +1,120 @@
+# Imports
+from collections import deque
+
+
+def parse_parents(ng):
+    '''RETURNS PARENT NAMES OF NG FIELD (EMPTY FOR OG HLAAHU)'''
+    if not isinstance(ng, str):
+        return ()
+    return tuple(name.strip() for name in ng.split(',') if name.strip())
+
+
+class Genealogy:
+    '''NAME INDEX AND PARENT GRAPH OF A HLAAHU LEXICON, BUILT ONCE PER LOAD'''
+
+    def __init__(self, lex):
+        names = lex['Name'].tolist()
+        # Name to number (first entry of every name), duplicates are reported
+        self.number = {}
+        self.duplicates = {}
+        for name, no in zip(names, lex['NO.'].tolist()):
+            if name in self.number:
+                self.duplicates.setdefault(name, [self.number[name]]).append(no)
+            else:
+                self.number[name] = no
+        # Parents and children of every NG hlaahu, unresolved parents are reported
+        self.parents = {}
+        self.children = {}
+        self.missing = {}
+        for name, ng in zip(names, lex['NG'].tolist()):
+            parents = parse_parents(ng)
+            if not parents or name in self.parents:
+                continue
+            self.parents[name] = parents
+            for parent in set(parents):
+                self.children.setdefault(parent, []).append(name)
+            lost = [parent for parent in parents if parent not in self.number]
+            if lost:
+                self.missing[name] = lost
+        self.gens = None
+
+    def problems(self):
+        '''RETURNS LIST OF DUPLICATE NAMES, UNRESOLVED PARENTS AND CYCLIC ANCESTRIES'''
+        out = ['Duplicate name {} (NO. {}), first entry used.'.format(name, ', '.join(map(str, nos)))
+               for name, nos in self.duplicates.items()]
+        out += ['Parent {} of {} not recognised.'.format(parent, name)
+                for name, lost in self.missing.items() for parent in lost]
+        out += ['Ancestry of {} is cyclic.'.format(name)
+                for name, gen in sorted(self.generations().items()) if gen is None]
+        return out
+
+    def origins(self, names):
+        '''RETURNS PARENT NUMBERS OF EVERY NAME (NONE FOR UNRESOLVED PARENTS)'''
+        return [tuple(self.number.get(parent) for parent in self.parents.get(name, ())) for name in names]
+
+    def generations(self):
+        '''RETURNS GENERATION OF EVERY NAME (0 FOR OG, NONE IF ITS ANCESTRY IS CYCLIC), IN ONE TOPOLOGICAL PASS'''
+        if self.gens is None:
+            names = set(self.number) | set(self.parents) | set(self.children)
+            todo = {name : len(set(self.parents.get(name, ()))) for name in names}
+            gens = dict.fromkeys(names)
+            queue = deque(name for name, count in todo.items() if count == 0)
+            while queue:
+                name = queue.popleft()
+                gens[name] = 1 + max(gens[parent] for parent in self.parents[name]) if name in self.parents else 0
+                for child in self.children.get(name, []):
+                    todo[child] -= 1
+                    if todo[child] == 0:
+                        queue.append(child)
+            self.gens = gens
+        return self.gens
+
+    def generation(self, name):
+        '''RETURNS GENERATION OF NAME'''
+        gens = self.generations()
+        if name not in gens:
+            raise ValueError('Hláhu name not recognised.')
+        return gens[name]
+
+    def ancestors(self, name, depth=None):
+        '''RETURNS DICTIONARY OF ANCESTORS OF NAME AND THEIR DISTANCE IN GENERATIONS (UP TO DEPTH)'''
+        return self.walk(name, self.parents, depth)
+
+    def descendants(self, name, depth=None):
+        '''RETURNS DICTIONARY OF DESCENDANTS OF NAME AND THEIR DISTANCE IN GENERATIONS (UP TO DEPTH)'''
+        return self.walk(name, self.children, depth)
+
+    def walk(self, name, graph, depth=None):
+        '''RETURNS DICTIONARY OF NAMES REACHABLE FROM NAME IN GRAPH AND THEIR DISTANCE (BREADTH-FIRST)'''
+        if name not in self.generations():
+            raise ValueError('Hláhu name not recognised.')
+        seen = {name : 0}
+        queue = deque([name])
+        while queue:
+            node = queue.popleft()
+            if depth is not None and seen[node] >= depth:
+                continue
+            for other in graph.get(node, ()):
+                if other not in seen:
+                    seen[other] = seen[node] + 1
+                    queue.append(other)
+        del seen[name]
+        return seen
+
+    def tree(self, name, depth=None):
+        '''RETURNS ANCESTRY TREE OF NAME AS NESTED DICTIONARIES (SHARED SUBTREES, CYCLES NOT EXPANDED)'''
+        gens = self.generations()
+        if name not in gens:
+            raise ValueError('Hláhu name not recognised.')
+        memo = {}
+        def grow(node, left):
+            if (node, left) not in memo:
+                expand = gens[node] is not None and left != 0
+                memo[node, left] = {
+                    'Name' : node,
+                    'NO.' : self.number.get(node),
+                    'Parents' : [grow(parent, None if left is None else left - 1)
+                                 for parent in self.parents.get(node, ())] if expand else []
+                }
+            return memo[node, left]
+        return grow(name, depth)
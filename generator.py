@@ -0,0 +1,159 @@
+# Imports
+from collections import Counter
+from conlang import pg_dic, get_evolver, trans_ipa_many, find_stress_many
+from collation import graphemes
+# External (numpy, pandas) are imported by the functions that need them
+
+# Places of a syllable in its word (templates are weighted per place)
+places = ['mono', 'initial', 'medial', 'final']
+# Parts of a syllable (vowel graphemes form the nucleus)
+parts = ['onset', 'nucleus', 'coda']
+
+
+def split_syllable(syll):
+    '''RETURNS ONSET, NUCLEUS AND CODA OF ORTHOGRAPHIC SYLLABLE (AS GRAPHEME TUPLES)'''
+    graphs = graphemes(syll)
+    vowel = [graph in pg_dic['V'] for graph in graphs]
+    if True not in vowel:
+        return tuple(graphs), (), ()
+    first = vowel.index(True)
+    last = len(vowel) - vowel[::-1].index(True)
+    return tuple(graphs[:first]), tuple(graphs[first:last]), tuple(graphs[last:])
+
+
+def place_of(i, count):
+    '''RETURNS PLACE OF SYLLABLE I IN A WORD OF COUNT SYLLABLES'''
+    if count == 1:
+        return 'mono'
+    return 'initial' if i == 0 else 'final' if i == count - 1 else 'medial'
+
+
+def table(counters):
+    '''RETURNS VALUES, CUMULATIVE WEIGHTS AND LAST INDICES OF GROUPS OF COUNTERS (GROUP G SPANS WEIGHTS G TO G + 1)'''
+    import numpy as np
+    values, cdf, last = [], [], []
+    for g, counter in enumerate(counters):
+        weights = np.cumsum([counter[value] for value in counter], dtype=np.float64)
+        values += list(counter)
+        cdf += list(g + weights / weights[-1]) if len(weights) else []
+        last.append(len(values) - 1)
+    return np.array(values), np.array(cdf), np.array(last)
+
+
+def draw(rng, table, group):
+    '''RETURNS VALUES DRAWN WITH THE WEIGHTS OF THEIR GROUP (ONE INVERSE TRANSFORM FOR ALL GROUPS)'''
+    import numpy as np
+    values, cdf, last = table
+    index = np.searchsorted(cdf, group + rng.random(len(group)), side='right')
+    return values[np.minimum(index, last[group])]
+
+
+class WordModel:
+    '''WEIGHTED SYLLABLE TEMPLATE MODEL OF AN ORTHOGRAPHIC LEXICON
+
+    Words draw their number of syllables, every syllable draws a template (onset, nucleus and coda lengths in
+    graphemes) weighted by its place in the word, and every part draws a cluster seen in the lexicon with that length,
+    so only attested clusters are combined. All draws are vectorized over the whole batch, and words are written as
+    rows of code points that are viewed as numpy strings (which are UTF-32) without building any str per word.
+    '''
+
+    def __init__(self, orthos):
+        import numpy as np
+        counts = Counter()
+        templates = {place : Counter() for place in places}
+        clusters = {part : {} for part in parts}
+        for ortho in orthos:
+            if not isinstance(ortho, str) or not ortho.strip('.'):
+                continue
+            sylls = ortho.lower().split('.')
+            counts[len(sylls)] += 1
+            for i, syll in enumerate(sylls):
+                split = split_syllable(syll)
+                templates[place_of(i, len(sylls))][tuple(len(cluster) for cluster in split)] += 1
+                for part, cluster in zip(parts, split):
+                    clusters[part].setdefault(len(cluster), Counter())[''.join(cluster)] += 1
+        if not counts:
+            raise ValueError('Lexicon has no words to train on.')
+        self.counts = table([counts])
+        self.templates = table([templates[place] for place in places])
+        # Clusters of every part (grouped by length in graphemes) as indices into rows of code points
+        self.chars, self.lengths, self.clusters = {}, {}, {}
+        for part in parts:
+            values, cdf, last = table([clusters[part].get(k, Counter()) for k in range(max(clusters[part]) + 1)])
+            self.chars[part] = values.view(np.uint32).reshape(len(values), -1)
+            self.lengths[part] = np.strings.str_len(values)
+            self.clusters[part] = (np.arange(len(values)), cdf, last)
+
+    def sample(self, n, seed=None):
+        '''RETURNS ARRAY OF N SAMPLED WORDS (DOTTED ORTHOGRAPHY)'''
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        count = draw(rng, self.counts, np.zeros(n, dtype=np.int64))
+        # Syllables of all words, with their word and place
+        start = np.cumsum(count) - count
+        word = np.repeat(np.arange(n), count)
+        index = np.arange(len(word)) - start[word]
+        place = np.where(count[word] == 1, 0, np.where(index == 0, 1, np.where(index == count[word] - 1, 3, 2)))
+        # Templates per place, clusters per part and length
+        shape = draw(rng, self.templates, place).reshape(len(word), 3)
+        chosen = np.stack([draw(rng, self.clusters[part], shape[:, j]) for j, part in enumerate(parts)], axis=1)
+        lengths = np.stack([self.lengths[part][chosen[:, j]] for j, part in enumerate(parts)], axis=1)
+        # Position of every syllable in its word (after the dots of the syllables before it)
+        width = lengths.sum(axis=1) + 1
+        pos = np.cumsum(width) - width
+        pos = pos - pos[start][word]
+        size = int((pos + width).max()) - 1 if n else 1
+        # Write code points of dots and clusters into one flat buffer
+        buf = np.zeros(n * size, dtype=np.uint32)
+        pos = pos + word * size
+        at = index > 0
+        buf[pos[at] - 1] = ord('.')
+        for j, part in enumerate(parts):
+            chars = self.chars[part]
+            for c in range(chars.shape[1]):
+                at = np.flatnonzero(lengths[:, j] > c)
+                buf[pos[at] + c] = chars[chosen[at, j], c]
+            pos = pos + lengths[:, j]
+        return buf.view('U{}'.format(size))
+
+
+def known_forms(orthos):
+    '''RETURNS SET OF ORTHOGRAPHIES WITHOUT SYLLABLE BOUNDARIES'''
+    return set(ortho.replace('.', '').lower() for ortho in orthos if isinstance(ortho, str))
+
+
+def fresh_words(words, known, known_evo, lang='IS'):
+    '''RETURNS NEW WORDS (NOT KNOWN, NOT EVOLVING INTO A KNOWN EVOLVED FORM) AND THEIR EVOLVED FORMS'''
+    import numpy as np
+    import pandas as pd
+    if not len(words):
+        return [], []
+    # Unique candidates that are not in the lexicon
+    keys = np.strings.replace(np.asarray(words, dtype=str), '.', '')
+    keys, first = np.unique(keys, return_index=True)
+    keep = np.sort(first[[key not in known for key in keys.tolist()]])
+    words = np.asarray(words)[keep].tolist()
+    # Evolved forms, neither known nor shared by two new words
+    evos = get_evolver(lang).evolve_many(words)
+    evo_keys = pd.Series(evos).str.replace('.', '', regex=False)
+    keep = ~evo_keys.duplicated().to_numpy() & np.array([key not in known_evo for key in evo_keys.tolist()], dtype=bool)
+    return [word for word, k in zip(words, keep) if k], [evo for evo, k in zip(evos, keep) if k]
+
+
+def generate(lex, n, evolved=(), seed=None, lang='IS'):
+    '''RETURNS LEXICON OF NEW WORDS SAMPLED FROM MODEL OF LEXICON (COLLIDING CANDIDATES DROPPED)'''
+    import pandas as pd
+    if n <= 0:
+        return pd.DataFrame(columns=['Orthography', 'IPA', 'Stress', 'Evolved'])
+    orthos = lex['Orthography'].tolist()
+    # Known evolved forms (of the evolved lexicon and of the lexicon as it evolves now)
+    known_evo = known_forms(list(evolved) + get_evolver(lang).evolve_many(ortho for ortho in orthos
+                                                                          if isinstance(ortho, str)))
+    words, evos = fresh_words(WordModel(orthos).sample(n, seed), known_forms(orthos), known_evo, lang)
+    ipas = trans_ipa_many(words, lang)
+    return pd.DataFrame({
+        'Orthography' : words,
+        'IPA' : ipas,
+        'Stress' : find_stress_many(ipas, lang),
+        'Evolved' : evos
+    })
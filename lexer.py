@@ -1,25 +1,16 @@
 # Imports
 # Internal
 import argparse
+import csv
+import sys
+import time
 import warnings
-# External
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from operator import itemgetter
-# Matplotlib config
-from matplotlib import rcParams
-rcParams.update({'figure.autolayout': True})
-
-# Path Dictionary
-path_dic = {
-    # Language lexicons
-    'IS' : r'C:/Users/Nika/Python/linguistics-conlang/data/iskeelis.tsv',
-    # Evolved lexicon
-    'EVO' : r'C:/Users/Nika/Python/linguistics-conlang/data/evolved.tsv',
-    # Hláhu/Fauja lexicon
-    'FAU' : r'C:/Users/Nika/Python/linguistics-conlang/data/hlaahu.tsv'
-}
+# Library
+from conlang import (path_dic, evo_cache, trans_ipa, find_stress, add_stress, evolver, load_cache, save_cache,
+                     save_tsv, read_lexicon, open_lexicon, make_entry, read_entries, append_tsv, evolve_lexicon, evolve_incremental,
+                     evo_stamp, search_lexicon, lang_code, insert_tsv)
+from phonology import Syllables, phoneme_stats, vowels
+# External (numpy, pandas, matplotlib) are imported lazily by the modes that need them
 
 # Suppress FutureWarning
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -31,403 +22,113 @@ parser.add_argument('mode', type=str, action='store', metavar='action mode',
                     help='Please see README.md or github.com/Polymero/linguistics-conlang for help.')
 parser.add_argument('lang', type=str, action='store', metavar='language code')
 # Entry Parameters
-parser.add_argument('-entry', type=str, default='', help='All-in-one entry (sep=\':\')')
+parser.add_argument('-entry', type=str, action='append', help='All-in-one entry (sep=\':\'), repeatable for add')
+parser.add_argument('-file', type=str, default='', help='File of all-in-one entries (one per line, stdin for import if empty)')
 parser.add_argument('-id', type=int, default=None, help='Index ID of entry')
 parser.add_argument('-ax', type=str, default='', help='Search axis')
 parser.add_argument('-ser', type=str, default='', help='Search')
+parser.add_argument('-match', type=str, default='sub', help='Search type: exact, prefix, sub or seg (IPA segments)')
 parser.add_argument('-ran', type=int, default=0, help='Number of samples')
 parser.add_argument('-i', type=int, default=0, help='Input Age')
 parser.add_argument('-f', type=int, default=99, help='Output Age')
-
-# Return 'help' information if parsing not succesful
-try:
-    args = parser.parse_args()
-except TypeError:
-    parser.print_help()
-
-# Parser variables
-mode    = args.mode
-lang    = args.lang
-entry   = args.entry
-id      = args.id
-axis    = args.ax
-search  = args.ser
-ran_num = args.ran
-age_i   = args.i
-age_f   = args.f
-
-#-------------------------------------------------------------------------------
-# SUPPORT FUNCTIONS
-#-------------------------------------------------------------------------------
-def trans_ipa(ortho, lang='IS', age=0):
-    '''RETURNS IPA FROM ORTHOGRAPHIC INPUT'''
-    if lang.lower() == 'is':
-        # Replace digraphs
-        ortho = ortho.replace('hl', 'H').replace('tl', 'L').replace('sh', 'S').replace('ch', 'C').replace('dh', 'D')
-        ortho = ortho.replace('au', 'Á').replace('eu', 'É').replace('ou', 'Ó')
-        # Split into syllables
-        syllables = [list(x) for x in ortho.split('.')]
-        # Replace characters accordingly
-        for j in range(len(syllables)): # For each syllable
-            syl = syllables[j]
-            length = len(syl)
-            for i in range(length): # For each letter
-                if syl[i] == 'i':
-                    syllables[j][i] = 'ɪ'
-                elif syl[i] == 'í':
-                    syllables[j][i] = 'i'
-                elif syl[i] == 'á':
-                    syllables[j][i] = 'aː'
-                elif syl[i] == 'Á':
-                    syllables[j][i] = 'aʊ'
-                elif syl[i] == 'É':
-                    syllables[j][i] = 'ɛʊ'
-                elif syl[i] == 'Ó':
-                    syllables[j][i] = 'ɔʊ'
-                elif syl[i] == 'D':
-                    syllables[j][i] = 'ð'
-                elif syl[i] == 'n':
-                    if i == length - 1:
-                        if j != len(syllables) - 1: # /n/ to velar nasal
-                            if syllables[j+1][0] in 'ghk':
-                                syllables[j][i] = 'ŋ'
-                elif syl[i] == 'r':
-                    syllables[j][i] = 'ɾ'
-                elif syl[i] == 'ŕ':
-                    syllables[j][i] = 'ʀ'
-                elif syl[i] == 'o':
-                    syllables[j][i] = 'ɔ'
-                elif syl[i] == 'ó':
-                    syllables[j][i] = 'ɔː'
-                elif syl[i] == 'e':
-                    syllables[j][i] = 'ɛ'
-                elif syl[i] == 'é':
-                    syllables[j][i] = 'ɛː'
-                elif syl[i] == 'q':
-                    syllables[j][i] = 'ɣ'
-                elif syl[i] == 'L':
-                    syllables[j][i] = 'tɬ'
-                elif syl[i] == 'H':
-                    syllables[j][i] = 'ɬ'
-                elif syl[i] == 'j':
-                    if (i != 0) & (i != length - 1): # Parasitic /j/
-                        syllables[j][i] = 'ʲ'
-                elif syl[i] == 'S':
-                    syllables[j][i] = 'ʃ'
-                elif syl[i] == 'C':
-                    syllables[j][i] = 'tʃ'
-                elif syl[i] == "'":
-                    syllables[j][i] = ''
-                elif syl[i] == 'w':
-                    syllables[j][i] = 'ʋ'
-        # Paste characters back together
-        for i in syllables:
-            i.append('.')
-        ipa = ''.join([char for syl in syllables for char in syl])
-        ipa = ipa[:-1]
-    # Raise error if language code not recognised
-    else:
-        raise ValueError('Language not recognised.')
-    # Return transcribed orthography
-    return ipa
-
-
-def find_stress(ipa, lang='IS', age=0):
-    '''RETURNS INDEX OF STRESSED SYLLABLE'''
-    if lang.lower() == 'is':
-        # Split into syllables
-        sylls = ipa.split('.')
-        # One syllable words
-        if len(sylls) == 1:
-            stress = -1
-        # Stress on penultimate syllable, except if final syllable has a long vowel or /i/
-        else:
-            if ('ː' in sylls[-1] or 'i' in sylls[-1]):
-                stress = -1
-            else:
-                stress = -2
-    # Raise error if language code not recognised
-    else:
-        raise ValueError('Language not recognised.')
-    # Return stress index
-    return stress
-
-
-def evolver(entry, age_i, age_f, lang='IS'):
-    '''RETURNS EVOLVED ENTRY'''
-    word = entry
-    # Phoneme groups
-    pgS = 'aeoui'                   # short vowels
-    pgL = 'áéóí'                    # long vowels (and /i/)
-    pgV = pgS + pgL                 # all vowels
-    pgLiq = 'rljw'                  # liquids
-    pgC = 'qwrtpsdfghjklzxcvbnm'    # all consonants
-    # Check language code
-    if lang.lower() == 'is':
-        # AGE 0
-        if (age_i <= 0 and age_f >= 0):
-            # 0.1 /h/-dropping
-            word = word.replace('hl','L').replace('h', '').replace('L', 'hl')
-            # 0.2 Vowel hiatus
-            word = word.replace('á.á', 'á').replace('á.a', 'á').replace('a.á', 'á').replace('a.a', 'á')
-            word = word.replace('é.é', 'é').replace('é.e', 'é').replace('e.é', 'é').replace('e.e', 'é')
-            word = word.replace('ó.ó', 'ó').replace('ó.o', 'ó').replace('o.ó', 'ó').replace('o.o', 'ó')
-            word = word.replace('í.í', 'í').replace('i.í', 'ii').replace('í.i', 'ji')
-            for i in range(1, len(word)-1):
-                try:
-                    if (word[i] == '.' and word[i-1] in pgV and word[i+1] in pgV):
-                        if word[i-1] in 'ií':
-                            word = word[:i-1] + 'j' + word[i+1:]
-                        elif word[i+1] in 'ií':
-                            word = word[:i] + 'i' + word[i+2:]
-                        elif word[i-1] == 'u':
-                            word = word[:i-1] + 'w' + word[i+1:]
-                        elif word[i+1] == 'u':
-                            word = word[:i] + word[i+1:]
-                        else:
-                            word = word[:i] + word[i:]
-                except:
-                    pass
-            # Change notation
-            word = word.replace('áu', 'au').replace('éu', 'eu').replace('óu', 'ou')
-            word = word.replace('ái', 'ai').replace('éi', 'ei').replace('ói', 'oi')
-            # 0.3 Voicing of initial /p/ before long vowels
-            if (word[0] == 'p' and word[1] in pgL):
-                word = 'b' + word[1:]
-            # 0.4 Parasitic /j/
-            for i in range(2, len(word)-2):
-                if (word[i] == '.' and word[i+1] == 'j' and word[i-1] in pgC):
-                    if word[i-2] == 'a':
-                        word = word[:i-2] + 'á.' + word[i-1] + word[i+1:]
-                    elif word[i-2] == 'e':
-                        word = word[:i-2] + 'é.' + word[i-1] + word[i+1:]
-                    elif word[i-2] == 'o':
-                        word = word[:i-2] + 'ó.' + word[i-1] + word[i+1:]
-                    elif word[i-2] == 'i':
-                        word = word[:i-2] + 'í.' + word[i-1] + word[i+1:]
-        # AGE 1
-        if (age_i <= 1 and age_f >= 1):
-            # 1.1 Intervocalic voicing of voiceless stops
-            for i in range(1, len(word)-1):
-                if word[i-1] == '.': # a.ka cases
-                    if (word[i-2] in pgV and word[i+1] in pgV):
-                        if word[i] == 'p':
-                            word = word[:i] + 'b' + word[i+1:]
-                        elif word[i] == 't':
-                            word = word[:i] + 'd' + word[i+1:]
-                        elif word[i] == 'k':
-                            word = word[:i] + 'g' + word[i+1:]
-                if word[i+1] == '.': # ak.a cases
-                    if (word[i-1] in pgV and word[i+2] in pgV):
-                        if word[i] == 'p':
-                            word = word[:i] + 'b' + word[i+1:]
-                        elif word[i] == 't':
-                            word = word[:i] + 'd' + word[i+1:]
-                        elif word[i] == 'k':
-                            word = word[:i] + 'g' + word[i+1:]
-            # 1.2 Voicing of stops in nasal cluster
-            for i in range(1, len(word)-1):
-                if (word[i] == '.' and word[i-1] in 'mn' and word[i+1] in 'ptk'): # m.k cases
-                    if word[i+1] == 'p':
-                        word = word[:i+1] + 'b' + word[i+2:]
-                    if word[i+1] == 't':
-                        word = word[:i+1] + 'd' + word[i+2:]
-                    if word[i+1] == 'k':
-                        word = word[:i+1] + 'g' + word[i+2:]
-                if (word[i] == '.' and word[i+1] in 'mn' and word[i-1] in 'ptk'): # k.m cases
-                    if word[i-1] == 'p':
-                        word = word[:i-1] + 'b' + word[i:]
-                    if word[i-1] == 't':
-                        word = word[:i-1] + 'd' + word[i:]
-                    if word[i-1] == 'k':
-                        word = word[:i-1] + 'g' + word[i:]
-            # 1.3 Further vowel hiatus
-            for i in range(1, len(word)-1):
-                if (word[i] == '.' and word[i-1] in pgV and word[i+1] in pgV):
-                    if word[i-1] in 'eé':
-                        word = word[:i+1] + 'k' + word[i+1:] # epenthetic /k/
-        # AGE 2
-        if (age_i <= 2 and age_f >= 2):
-            # 2.1 Nasal assimilation
-            for i in range(1, len(word)-1):
-                if word[i] == '.':
-                    if (word[i-1] == 'n' and word[i+1] in 'pb'):
-                        word = word[:i-1] + 'm' + word[i:]
-                    elif (word[i-1] in 'pb' and word[i+1] == 'n'):
-                        word = word[:i+1] + 'm' + word[i+2:]
-            # 2.2 Gemination of voiceless stop clusters
-            for i in range(1, len(word)-1):
-                if (word[i] == '.' and word[i-1] in 'ptk' and word[i+1] in 'ptk'):
-                    word = word[:i-1] + word[i+1] + word[i:]
-            # 2.3 Voicing of /s/ preceding long vowels
-            word = word.replace('s.s', 'S.S')
-            word = word.replace('sá', 'zá').replace('sé', 'zé').replace('só', 'zó')
-            word = word.replace('S.S', 's.s')
-            # 2.4 /ju/ -> /xu/
-            for i in range(0, len(word)-1):
-                if (word[i] == 'j' and word[i+1] in 'uíi'):
-                    if i != 0:
-                        if word[i-1] not in pgC:
-                            word = word[:i] + 'x' + word[i+1:]
-                    if i == 0:
-                        word = 'x' + word[i+1:]
-        # AGE 3
-        if (age_i <= 3 and age_f >= 3):
-            # 3.1 Palatalisation of tj, sj, tí, kí, sí
-            word = word.replace('tj', 'ch').replace('tí', 'chí').replace('ti', 'chi')
-            word = word.replace('sj', 'sh').replace('sí', 'shí').replace('si', 'shi')
-            word = word.replace('k.k', 'K.K')
-            word = word.replace('kjé', 'ché').replace('kje', 'che').replace('kjí', 'chí').replace('kji', 'chi')
-            word = word.replace('kí', 'chí').replace('ki', 'chi').replace('ké', 'ché').replace('ke', 'che')
-            word = word.replace('K.K', 'k.k')
-            # 3.2 Intervocalic spirantisation of voiced stops
-            for i in range(1, len(word)-1):
-                if word[i-1] == '.': # a.ga cases
-                    if (word[i-2] in pgV and word[i+1] in pgV):
-                        if word[i] == 'b':
-                            word = word[:i] + 'v' + word[i+1:]
-                        elif word[i] == 'd':
-                            word = word[:i] + 'dh' + word[i+1:]
-                        elif word[i] == 'g':
-                            word = word[:i] + 'q' + word[i+1:]
-                if word[i+1] == '.': # ag.a cases
-                    if (word[i-1] in pgV and word[i+2] in pgV):
-                        if word[i] == 'b':
-                            word = word[:i] + 'v' + word[i+1:]
-                        elif word[i] == 'd':
-                            word = word[:i] + 'dh' + word[i+1:]
-                        elif word[i] == 'g':
-                            word = word[:i] + 'q' + word[i+1:]
-            # 3.3 Intervocalic voicing of voiceless stops
-            for i in range(1, len(word)-1):
-                if word[i-1] == '.': # a.ka cases
-                    if (word[i-2] in pgV and word[i+1] in pgV):
-                        if word[i] == 'p':
-                            word = word[:i] + 'b' + word[i+1:]
-                        elif word[i] == 't':
-                            word = word[:i] + 'd' + word[i+1:]
-                        elif word[i] == 'k':
-                            word = word[:i] + 'g' + word[i+1:]
-                if word[i+1] == '.': # ak.a cases
-                    if (word[i-1] in pgV and word[i+2] in pgV):
-                        if word[i] == 'p':
-                            word = word[:i] + 'b' + word[i+1:]
-                        elif word[i] == 't':
-                            word = word[:i] + 'd' + word[i+1:]
-                        elif word[i] == 'k':
-                            word = word[:i] + 'g' + word[i+1:]
-        # AGE 4
-        if (age_i <= 4 and age_f >= 4):
-            # 4.1 Spirantisation of word initial /p/ before short vowels and liquids
-            if (word[0] == 'p' and word[1] in pgS+pgLiq):
-                word = 'f' + word[1:]
-            # 4.2 Loss of word-final short vowels
-            if ('.' in word and word[-1] in pgS and word[-2] not in 'rw'): # add double consonant rule?
-                if word[-4] not in pgC+'.':
-                    word = word[:-1]
-                    syll = word.split('.')
-                    word = '.'.join(syll[:-1]) + syll[-1]
-            # 4.3 Shortening of word-final long vowels
-            if ('.' in word and word[-1] in pgL):
-                if word[-1] == 'á':
-                    word = word[:-1] + 'a'
-                elif word[-1] == 'é':
-                    word = word[:-1] + 'e'
-                elif word[-1] == 'ó':
-                    word = word[:-1] + 'o'
-            # 4.4 Centralisation of word-final í /i/
-            if ('.' in word and word[-1] == 'í'):
-                word = word[:-1] + 'i'
-            # 4.5 Devoicing of word-final stops
-            if word[-1] in 'bdg':
-                if word[-1] == 'b':
-                    word = word[:-1] + 'p'
-                elif word[-1] == 'd':
-                    word = word[:-1] + 't'
-                elif word[-1] == 'g':
-                    word = word[:-1] + 'k'
-            # 4.6 Dropping of word-final /s/ (unless word too short)
-            if (word[-1] == 's' and len(word) > 2):
-                word = word[:-1]
-    # Raise error if language code not recognised
-    else:
-        raise ValueError('Evolution path not recognised.')
-    # Return evolved entry
-    return word
-
+parser.add_argument('-jobs', type=int, default=1, help='Number of processes')
+parser.add_argument('-sweep', action='store_true', help='Keep orthography of every intermediate age')
+parser.add_argument('-cache', type=str, default='', help='Evolution cache file')
+parser.add_argument('-inc', action='store_true', help='Only evolve added or changed entries')
+parser.add_argument('-sort', action='store_true', help='Insert added entries in collation order (sorting the lexicon once)')
+parser.add_argument('-k', type=int, default=1, help='Maximum phoneme edit distance of near-homophones')
+parser.add_argument('-seed', type=int, default=None, help='Random seed of generated words')
+parser.add_argument('-host', type=str, default='127.0.0.1', help='Server host')
+parser.add_argument('-port', type=int, default=8080, help='Server port')
 
 #-------------------------------------------------------------------------------
 # MAIN FUNCTIONS
 #-------------------------------------------------------------------------------
-def add(path, entry, mode='write'):
-    '''APPENDS ENTRY TO CORRESPONDING LEXICON'''
-    if mode == 'write':
-        try:
-            lex = pd.read_csv(path, sep=r'\t', engine='python')
-        except:
-            raise ValueError('Error loading CSV.')
-
-    if path == path_dic["IS"]:
-        # Split entry parameter
-        ortho, fauja, age, type, desc = entry.split(':')
-        # Get IPA
-        ipa = trans_ipa(ortho, lang='IS', age=age)
-        # Create entry dictionary
-        ne = {
-            'Orthography' : ortho,
-            'IPA' : ipa,
-            'Stress' : find_stress(ipa, lang='IS', age=age),
-            'Hláhu' : fauja,
-            'Age' : age,
-            'Class' : type,
-            'Description' : desc
-        }
+def print_entry(ne):
+    '''PRINTS ENTRY DICTIONARY (ALIGNED LIKE A PANDAS SERIES)'''
+    kw = max(len(key) for key in ne)
+    vw = max(len(str(val)) for val in ne.values())
+    for key, val in ne.items():
+        print('{}    {}'.format(key.ljust(kw), str(val).rjust(vw)))
 
-    elif path == path_dic["FAU"]:
-        # Split entry parameter
-        number, namedot, desc, ngstat = entry.split(':')
-        # Get syllables
-        if '.' not in namedot:
-            namedot += '. '
-        sylls = namedot.lower().split('.')
-        # Get evolved word
-        evoname = evolver(namedot, 0, 9, lang="IS")
-        if '.' not in evoname:
-            evoname += '. '
-        evosylls = evoname.split('.')
-        # Get NGstat
-        if ngstat == '':
-            ngstat = ' '
-        # Create entry dictionary
-        ne = {
-            'NO.' : int(number),
-            'Name' : namedot.replace('.', '').replace(' ', ''),
-            'Nerlé' : sylls[0],
-            'Óle' : ', '.join(sylls[1:]),
-            'Description' : desc,
-            'Evo. Name' : evoname.replace('.', '').replace(' ', ''),
-            'Evo. Nerle' : evosylls[0],
-            'Evo. Ól' : ', '.join(evosylls[1:]),
-            'NG' : ngstat
-        }
 
+def add(path, entry, mode='write', keep_sorted=False):
+    '''APPENDS ENTRY (OR LIST OF ENTRIES) TO CORRESPONDING LEXICON (OR INSERTS IT IN COLLATION ORDER)'''
+    entries = [entry] if isinstance(entry, str) else list(entry)
+    nes = [make_entry(path, e, stress=False) for e in entries]
+    if path == path_dic['IS']:
+        add_stress(nes)
     if mode == 'write':
-        # Add entry to lexicon
-        lex = lex.append(ne, ignore_index=True)
-        lex.to_csv(path, sep='\t', index=False)
+        # Add entries to lexicon
+        if keep_sorted:
+            insert_tsv(path, nes)
+        else:
+            append_tsv(path, nes)
         # Succes message
-        print('\nSuccesfully logged the following entry:')
-        print(pd.Series(ne))
+        if len(nes) == 1:
+            print('\nSuccesfully logged the following entry:')
+            print_entry(nes[0])
+        else:
+            import pandas as pd
+            print('\nSuccesfully logged the following {} entries:'.format(len(nes)))
+            print(pd.DataFrame(nes))
     elif mode == 'return':
-        return ne
+        return nes[0] if isinstance(entry, str) else nes
+
+
+def imp(path, source='', keep_sorted=False):
+    '''APPENDS ALL NEW ENTRIES FROM FILE (OR STDIN) TO CORRESPONDING LEXICON (OR INSERTS THEM IN COLLATION ORDER)'''
+    t0 = time.time()
+    key = {path_dic['IS'] : 'Orthography', path_dic['FAU'] : 'Name'}.get(path)
+    if key is None:
+        raise ValueError('Entries can only be added to the IS and FAU lexicons.')
+    # Existing keys (without loading the whole lexicon)
+    try:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            known = set(row[key] for row in csv.DictReader(f, delimiter='\t'))
+    except FileNotFoundError:
+        known = set()
+    # Stream, validate and deduplicate entries
+    f = open(source, 'r', encoding='utf-8') if source else sys.stdin
+    nes, dups, rejects = [], 0, []
+    for num, line in enumerate(f, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.startswith('#'):
+            continue
+        try:
+            ne = make_entry(path, line, stress=False)
+        except (ValueError, IndexError) as e:
+            rejects.append((num, line, e))
+            continue
+        if not ne[key]:
+            rejects.append((num, line, 'empty {}'.format(key)))
+        elif ne[key] in known:
+            dups += 1
+        else:
+            known.add(ne[key])
+            nes.append(ne)
+    if source:
+        f.close()
+    # Commit in one write (stress of all entries from one syllabification)
+    if nes:
+        if path == path_dic['IS']:
+            add_stress(nes)
+        if keep_sorted:
+            insert_tsv(path, nes)
+        else:
+            append_tsv(path, nes)
+    # Report
+    for num, line, e in rejects:
+        print('Rejected line {} ({}): {}'.format(num, e, line))
+    dt = time.time() - t0
+    print('\nImported {} entries ({} duplicates, {} rejected) in {:.2f} s ({:.0f} entries/s).'
+          .format(len(nes), dups, len(rejects), dt, len(nes) / dt if dt > 0 else 0))
 
 
 def rem(path, id):
     '''REMOVES ENTRY FROM CSV ACCORDING TO ID'''
-    try:
-        lex = pd.read_csv(path, sep=r'\t', engine='python')
-    except:
-        raise ValueError('Error loading CSV.')
+    import pandas as pd
+    lex = read_lexicon(path)
     # Drop row with index equal to given ID
     re = lex.iloc[id]
     lex = lex.drop(id, axis=0)
@@ -437,18 +138,17 @@ def rem(path, id):
     print(pd.Series(re))
 
 
-def lst(path, axis, search, ran_num):
+def lst(path, axis, search, ran_num, match='sub'):
     '''PRINTS (RANDOM) ENTRIES ACCORDING TO SEARCH'''
-    try:
-        lex = pd.read_csv(path, sep=r'\t', engine='python')
-    except:
-        raise ValueError('Error loading CSV.')
+    import pandas as pd
+    from collation import collation_order
+    lex, codes = open_lexicon(path, collation=True)
     # Set print options
     pd.set_option('display.expand_frame_repr', False)
     pd.set_option('display.max_rows', 999)
     # Apply search
     if (axis != '' and search != ''):
-        plex = lex[lex[axis].str.lower().str.contains(search.lower())]
+        plex = search_lexicon(path, lex, axis, search, match)
     else:
         plex = lex
     # Apply random sampling
@@ -456,7 +156,7 @@ def lst(path, axis, search, ran_num):
         plex = lex.sample(n=int(ran_num))
     # Print resulting DataFrame
     if path in [path_dic['IS'], path_dic['EVO']]:
-        print(plex.sort_values('Orthography'))
+        print(plex.iloc[collation_order(codes[plex.index])])
     elif path == path_dic['FAU']:
         print(plex.sort_values('NO.'))
     # Raise error if language code not recognised
@@ -465,11 +165,9 @@ def lst(path, axis, search, ran_num):
 
 
 def upd(path):
+    import pandas as pd
     # Get lexicon
-    try:
-        lex = pd.read_csv(path, sep=r'\t', engine='python')
-    except:
-        raise ValueError('Error loading CSV.')
+    lex = read_lexicon(path)
     # Build new lexicon
     lex_new = pd.DataFrame(columns=list(lex.columns))
 
@@ -479,107 +177,208 @@ def upd(path):
     lex_new.to_csv(lex_path, sep='\t', index=False)
 
 
-def evo(path, entry, lang, age_i, age_f):
-    # Take whole lexicon if entry == 'all'
-    if entry == 'all':
-        try:
-            lex = pd.read_csv(path, sep=r'\t', engine='python')
-        except:
-            raise ValueError('Error loading CSV.')
-    else:
-        # Get IPA
-        ipa = trans_ipa(entry, lang=lang, age=age_i)
-        # Create entry and lexicon
-        ne = {
-            'Orthography' : entry,
-            'IPA' : ipa,
-            'Stress' : find_stress(ipa),
+def evo(path, entry, lang, age_i, age_f, jobs=1, sweep=False, cache='', inc=False):
+    '''PRINTS EVOLVED ENTRY, OR EVOLVES AND SAVES THE WHOLE LEXICON FOR ENTRY all'''
+    if cache:
+        load_cache(cache)
+    # Single entry (without pandas)
+    if (entry != 'all' and not sweep):
+        new = evolver(entry, age_i, age_f, lang=lang)
+        ipa_new = trans_ipa(new, lang)
+        print_entry({
+            'Orthography' : new,
+            'IPA' : ipa_new,
+            'Stress' : find_stress(ipa_new, lang),
             'Hláhu' : '',
             'Age' : age_i,
             'Class' : '',
-            'Description' : ''
-        }
-        lex = pd.DataFrame([pd.Series(ne)])
-    # Create empty evolved lexicon
-    evolex = pd.DataFrame(columns=list(lex.columns))
-    # Iterate over all entries
-    for index, series in lex.iterrows():
-        # Get evolved word
-        new = evolver(series['Orthography'], series['Age'], age_f, lang=lang)
-        # Get IPA
-        ipa_new = trans_ipa(new, lang)
-        # Create entry
-        ne = {
-            'Orthography' : new,                                    # Evolved orthography
-            'IPA' : ipa_new,                                        # Evolved IPA
-            'Stress' : find_stress(ipa_new, lang),                  # Stress
-            'Hláhu' : series['Hláhu'],                              # Hláhu (NG not included)
-            'Age' : int(series['Age']),                             # Final age
-            'Class' : series['Class'],                              # Class
-            'Description' : series['Description'],                  # Description
-            'OG Ortho' : series['Orthography'],                     # Original orthography
-            'OG IPA' : trans_ipa(series['Orthography'], lang),      # Original IPA
-            'Changed' : str(new != series['Orthography'])           # Changed (boolean string)
-        }
-        # Append evolved entry to evolved lexicon
-        evolex = evolex.append(ne, ignore_index=True)
-    # Save evolved lexicon
-    if entry == 'all':
-        evolex.to_csv(path_dic['EVO'], sep='\t', index=False)
+            'Description' : '',
+            'Changed' : str(new != entry),
+            'OG IPA' : trans_ipa(entry, lang),
+            'OG Ortho' : entry
+        })
+    else:
+        import pandas as pd
+        # Take whole lexicon if entry == 'all'
+        if entry == 'all':
+            lex = read_lexicon(path)
+        else:
+            # Get IPA
+            ipa = trans_ipa(entry, lang=lang, age=age_i)
+            # Create entry and lexicon
+            ne = {
+                'Orthography' : entry,
+                'IPA' : ipa,
+                'Stress' : find_stress(ipa, lang),
+                'Hláhu' : '',
+                'Age' : age_i,
+                'Class' : '',
+                'Description' : ''
+            }
+            lex = pd.DataFrame([pd.Series(ne)])
+        # Only (re-)evolve changed entries if evolved lexicon was built with the same settings
+        stamp = evo_stamp(lang, age_f, sweep)
+        try:
+            with open(path_dic['EVO'] + '.stamp', 'r') as f:
+                old_stamp = f.read().strip()
+        except OSError:
+            old_stamp = ''
+        # Evolve all entries at once
+        if entry == 'all' and inc and old_stamp == stamp:
+            evolex = evolve_incremental(lex, read_lexicon(path_dic['EVO'], 'EVO'), lang, age_f, jobs, sweep)
+        else:
+            evolex = evolve_lexicon(lex, lang, age_f, jobs, sweep)
+        # Save evolved lexicon
+        if entry == 'all':
+            save_tsv(evolex, path_dic['EVO'])
+            with open(path_dic['EVO'] + '.stamp', 'w') as f:
+                f.write(stamp)
+        # Print result
+        pd.set_option('display.max_rows', 999)
+        print(evolex)
+    if cache:
+        save_cache(cache)
+        print('\nEvolution cache:', evo_cache.info())
+
+
+def gen(path, ran_num, seed=None):
+    '''PRINTS NEW WORDS SAMPLED FROM THE LEXICON (NONE ALREADY IN IT OR EVOLVING INTO AN EXISTING EVOLVED FORM)'''
+    import pandas as pd
+    from generator import generate
+    if path != path_dic['IS']:
+        raise ValueError('Words can only be generated for the IS lexicon.')
+    t0 = time.time()
+    lex = open_lexicon(path)
+    try:
+        evolved = open_lexicon(path_dic['EVO'])['Orthography'].tolist()
+    except FileNotFoundError:
+        evolved = []
+    new = generate(lex, ran_num if ran_num > 0 else 20, evolved, seed)
+    dt = time.time() - t0
     # Print result
+    pd.set_option('display.expand_frame_repr', False)
+    pd.set_option('display.max_rows', 999)
+    print(new)
+    print('\nGenerated {} new words from {} candidates in {:.2f} s.'.format(len(new), ran_num if ran_num > 0 else 20, dt))
+
+
+def dup(k=1):
+    '''PRINTS HOMOPHONES, EVOLUTION MERGERS AND NEAR-HOMOPHONES (WITHIN K PHONEME EDITS) OF BOTH LEXICONS'''
+    import pandas as pd
+    from neighbours import homophones, mergers, near_homophones
+    lex = open_lexicon(path_dic['IS'])
+    evolex = open_lexicon(path_dic['EVO'])
+    # Set print options
+    pd.set_option('display.expand_frame_repr', False)
     pd.set_option('display.max_rows', 999)
-    print(evolex)
+    def show(title, table):
+        print('\n{} ({})'.format(title, len(table)))
+        print(table if len(table) else 'None found.')
+    # Exact homophones, then distinct proto forms that evolved into one form
+    show('HOMOPHONES (PROTO)', homophones(lex))
+    show('HOMOPHONES (EVOLVED)', homophones(evolex))
+    show('EVOLUTION MERGERS', mergers(evolex))
+    # Near-homophones from the deletion neighbourhood index
+    show('NEAR-HOMOPHONES (PROTO, DISTANCE <= {})'.format(k), near_homophones(lex, k))
+    show('NEAR-HOMOPHONES (EVOLVED, DISTANCE <= {})'.format(k), near_homophones(evolex, k))
+
+
+def mpairs(path, sweep=False, age_i=0, age_f=99):
+    '''PRINTS MINIMAL PAIRS PER PHONEME CONTRAST (COMPARED TO THE PROTO LEXICON AND PER SOUND CHANGE FOR EVO)'''
+    import pandas as pd
+    from neighbours import contrasts, contrast_sweep
+    if path not in [path_dic['IS'], path_dic['EVO']]:
+        raise ValueError('Minimal pairs can only be found in the IS and EVO lexicons.')
+    lex = open_lexicon(path)
+    # Set print options
+    pd.set_option('display.expand_frame_repr', False)
+    pd.set_option('display.max_rows', 999)
+    table = contrasts(lex)
+    print('\nMINIMAL PAIRS ({} pairs, {} contrasts)'.format(table['Pairs'].sum(), len(table)))
+    print(table)
+    # Contrasts before and after evolution
+    if path == path_dic['EVO']:
+        proto = contrasts(lex.assign(IPA=lex['OG IPA'], Orthography=lex['OG Ortho']))
+        both = pd.merge(proto[['Contrast', 'Pairs']], table[['Contrast', 'Pairs']], on='Contrast', how='outer',
+                        suffixes=(' Proto', ' Evolved')).fillna(0)
+        both = both.astype({'Pairs Proto' : int, 'Pairs Evolved' : int})
+        lost = both[both['Pairs Evolved'] == 0]
+        print('\nCONTRASTS LOST IN EVOLUTION ({} of {})'.format(len(lost), len(proto)))
+        print(lost.sort_values('Pairs Proto', ascending=False).to_string(index=False) if len(lost) else 'None.')
+    # Minimal pairs after every sound change
+    if sweep:
+        orthos = lex['OG Ortho'] if path == path_dic['EVO'] else lex['Orthography']
+        print('\nMINIMAL PAIRS PER SOUND CHANGE')
+        print(contrast_sweep(orthos.tolist(), age_i, age_f).to_string(index=False))
 
 
 def anl(path):
     '''RETURNS SOME ANALYTICAL FIGURES FROM THE LEXICON'''
-    # Get lexicon
-    try:
-        lex = pd.read_csv(path, sep=r'\t', engine='python')
-    except:
-        raise ValueError('Error loading CSV.')
+    import numpy as np
+    import matplotlib.pyplot as plt
+    # Matplotlib config
+    from matplotlib import rcParams
+    rcParams.update({'figure.autolayout': True})
+    # Get lexicon, segmented into phonemes and syllables once
+    lex = open_lexicon(path)
+    sylls = Syllables(lex['IPA'])
+    stats = phoneme_stats(sylls.packed)
     # PHONEME DISTRIBUTION
-    phons = []
-    for index, series in lex.iterrows():
-        phons += list(series['IPA'])
-    chars, char_cnts = np.unique(phons, return_counts=True)
-    phono_tot = np.sum(char_cnts)
+    freq = stats['frequency'][stats['frequency'] > 0]
+    phono_tot = freq.sum()
     print('\nPHONEME DISTRIBUTION')
-    print(chars)
-    print(char_cnts)
+    print(np.array(list(freq.index)))
+    print(freq.values)
+    # Positions, bigrams and syllable structures
+    print('\nPHONEME POSITIONS')
+    print(stats['position'].loc[freq.index])
+    print('\nMOST FREQUENT BIGRAMS')
+    bigrams = stats['bigrams'].stack().nlargest(20)
+    bigrams.index = [first + ' ' + second for first, second in bigrams.index]
+    print(bigrams.to_string())
+    print('\nSYLLABLE STRUCTURE')
+    print(stats['structure'].to_string())
+    print('\nSYLLABLE WEIGHTS')
+    weights = np.bincount(sylls.table['weight'], minlength=3)
+    print('Light (open)       :', weights[0])
+    print('Closed             :', weights[1])
+    print('Long (ː or i)      :', weights[2])
+    print('Penultimate Stress :', np.sum(sylls.stress() == -2))
+    print('Phonotactic Errors :', np.sum(sylls.violations()))
     # Plot
     fig = plt.figure(figsize=(10,10))
     fr1 = fig.add_subplot(2,1,1)
     # Colour function
     def colour(phon):
-        if phon in ['ɑ', 'a', 'i', 'ɔ', 'o', 'ɛ', 'e', 'u', 'ɪ', 'ʊ']:
+        if phon[0] in vowels:
             return 'tab:orange'
-        elif phon in 'lɾʋj':
+        elif phon[0] in 'lɾʋj':
             return 'tab:blue'
-        elif phon in 'ʲ':
+        elif 'ʲ' in phon:
             return 'tab:red'
         else:
             return 'mediumaquamarine'
-    # Extract keys and values (but ignoring the '.')
-    kys, vls = list(zip(*sorted(list(zip(chars[1:], char_cnts[1:])), key=itemgetter(1), reverse=True)))
+    # Extract keys and values (sorted on abundance)
+    kys, vls = list(freq.index), freq.values
     cls = [colour(i) for i in kys]
     fr1.bar(list(range(len(vls))), vls / phono_tot, tick_label=kys, color=cls)
     # Styling
     top = 1.10*np.max(vls)
     for i in range(len(fr1.xaxis.get_major_ticks())):
         tick = fr1.xaxis.get_major_ticks()[i]
-        tick.label.set_fontsize(16)
-        tick.label.set_position((1, vls[i]/top + .085, 0))
+        tick.label1.set_fontsize(16)
+        tick.label1.set_position((1, vls[i]/top + .085, 0))
     fr1.set_ylim(0, top / phono_tot)
     fr1.set_title('(Relative) Phoneme Abundances (Sorted)')
     fr1.grid(alpha=0.3)
-    # WORD LENGTH (IPA)
-    wlens = [len(i) for i in lex['IPA']]
+    # WORD LENGTH (IPA SEGMENTS)
+    wlens = stats['lengths']
     print('\nWORD LENGTHS')
     print('Average Word Length:', np.mean(wlens))
     print('Std Word Length    :', np.std(wlens))
     print('Maximum Word Length:', np.max(wlens))
     print('Minimum Word Length:', np.min(wlens))
+    print('Average Syllables  :', np.mean(stats['syllables']))
     # Histogram Plot
     fr2 = fig.add_subplot(2,1,2)
     bins = np.array(list(range(min(wlens), max(wlens) + 2, 1))) - 0.5
@@ -593,36 +392,71 @@ def anl(path):
     fr2.plot(xp, gauss(xp, np.mean(wlens), np.std(wlens)) * sca, color='b', alpha=0.3)
     # Styling
     fr2.set_xlim(0, np.max(wlens) + 2)
-    fr2.set_title('Word Length Histogram (IPA) (with Gaussian Model)')
+    fr2.set_title('Word Length Histogram (IPA Segments) (with Gaussian Model)')
     plt.show()
 
 #-------------------------------------------------------------------------------
 # MODE FUNCTION
 #-------------------------------------------------------------------------------
-# Select correct lexicon path
-if lang.lower() in ['is', 'isk', 'iskélis', 'iskeelis']:
-    path = path_dic['IS']
-elif lang.lower() in ['hl', 'hlá', 'hla', 'hláhu', 'fau', 'fauja']:
-    path = path_dic['FAU']
-elif lang.lower() in ['evo', 'evolved', 'evolve']:
-    path = path_dic['EVO']
-# Raise error if language code not recognised
-else:
-    raise ValueError('Language code not recognised.')
+if __name__ == '__main__':
+    # Return 'help' information if parsing not succesful
+    try:
+        args = parser.parse_args()
+    except TypeError:
+        parser.print_help()
 
-# Run correct function according to mode
-if mode in ['add', 'a']:
-    add(path, entry)
-elif mode in ['rem', 'remove', 'r']:
-    rem(path, id)
-elif mode in ['lst', 'list', 'l']:
-    lst(path, axis, search, ran_num)
-elif mode in ['upd', 'update', 'u']:
-    upd(path)
-elif mode in ['evo', 'evolve', 'e']:
-    evo(path, entry, lang, age_i, age_f)
-elif mode in ['anl', 'analyse', 'analyze', 'a']:
-    anl(path)
-else:
-    print('Action mode not recognised, please check your input')
-    print('Avalable modes: add, rem, lst, upd, evo')
+    # Parser variables
+    mode    = args.mode
+    lang    = args.lang
+    entries = args.entry or []
+    entry   = entries[-1] if entries else ''
+    efile   = args.file
+    id      = args.id
+    axis    = args.ax
+    search  = args.ser
+    match   = args.match
+    ran_num = args.ran
+    age_i   = args.i
+    age_f   = args.f
+    jobs    = args.jobs
+    sweep   = args.sweep
+    cache   = args.cache
+    inc     = args.inc
+    sort    = args.sort
+    host    = args.host
+    port    = args.port
+    seed    = args.seed
+    k       = args.k
+
+    # Select correct lexicon path (raises error if language code not recognised)
+    path = path_dic[lang_code(lang)]
+
+    # Run correct function according to mode
+    if mode in ['add', 'a']:
+        if efile:
+            entries += read_entries(efile)
+        add(path, entries, keep_sorted=sort)
+    elif mode in ['imp', 'import', 'i']:
+        imp(path, efile, sort)
+    elif mode in ['rem', 'remove', 'r']:
+        rem(path, id)
+    elif mode in ['lst', 'list', 'l']:
+        lst(path, axis, search, ran_num, match)
+    elif mode in ['upd', 'update', 'u']:
+        upd(path)
+    elif mode in ['evo', 'evolve', 'e']:
+        evo(path, entry, lang, age_i, age_f, jobs, sweep, cache, inc)
+    elif mode in ['anl', 'analyse', 'analyze', 'a']:
+        anl(path)
+    elif mode in ['gen', 'generate', 'g']:
+        gen(path, ran_num, seed)
+    elif mode in ['dup', 'duplicates', 'd']:
+        dup(k)
+    elif mode in ['mpairs', 'pairs', 'm']:
+        mpairs(path, sweep, age_i, age_f)
+    elif mode in ['serve', 's']:
+        from server import serve
+        serve(lang, host, port)
+    else:
+        print('Action mode not recognised, please check your input')
+        print('Avalable modes: add, imp, rem, lst, upd, evo, anl, gen, dup, mpairs, serve')
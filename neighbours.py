@@ -0,0 +1,249 @@
+# Imports
+from itertools import groupby
+from conlang import get_evolver, trans_ipa_many
+from phonology import PackedWords, get_inventory, boundaries
+# External (numpy, pandas) are imported by the functions that need them
+
+# Polynomial hash of phoneme sequences (odd multiplier, so it has an inverse modulo 2**64)
+base = 0x9E3779B97F4A7C15
+base_inv = pow(base, -1, 2**64)
+# Mixed into wildcard keys, so equal deletions at different positions hash apart
+salt = 0xC2B2AE3D27D4EB4F
+
+
+def phoneme_rows(ipas, lang='IS'):
+    '''RETURNS PADDED MATRIX OF PHONEME CODES OF IPA INPUTS (BOUNDARIES DROPPED, 0 AS PADDING) AND THEIR LENGTHS'''
+    import numpy as np
+    packed = ipas if isinstance(ipas, PackedWords) else PackedWords.from_words(ipas, get_inventory(lang))
+    codes = packed.codes
+    word = np.repeat(np.arange(len(packed)), np.diff(packed.offsets.astype(np.int64)))
+    keep = codes >= len(boundaries)
+    codes, word = codes[keep], word[keep]
+    lengths = np.bincount(word, minlength=len(packed))
+    index = np.arange(len(codes)) - (np.cumsum(lengths) - lengths)[word]
+    rows = np.zeros((len(packed), max(int(lengths.max()) if len(packed) else 0, 1)), dtype=np.uint8)
+    rows[word, index] = codes
+    return rows, lengths, packed.inventory
+
+
+def prefix_hashes(rows):
+    '''RETURNS POLYNOMIAL HASHES OF ALL PREFIXES OF ROWS (COLUMN J HASHES THE FIRST J CODES)'''
+    import numpy as np
+    powers = np.array([pow(base, j, 2**64) for j in range(rows.shape[1])], dtype=np.uint64)
+    terms = rows.astype(np.uint64) * powers
+    return np.concatenate([np.zeros((len(rows), 1), dtype=np.uint64), np.cumsum(terms, axis=1, dtype=np.uint64)], axis=1)
+
+
+def deletion_keys(rows, lengths, k=1, wildcard=False):
+    '''RETURNS HASHES AND WORD IDS OF ALL VARIANTS OF ROWS WITH UP TO K PHONEMES DELETED
+
+    With wildcard, only single deletions are made and their position is part of the key, so two words share a key
+    exactly when they have the same length and differ in at most that one position (substitution neighbours).
+    '''
+    import numpy as np
+    from itertools import combinations
+    hashes = prefix_hashes(rows)
+    n = len(rows)
+    ids = np.arange(n)
+    full = hashes[ids, lengths]
+    keys, words = ([], []) if wildcard else ([full], [ids])
+    for d in ([1] if wildcard else range(1, k + 1)):
+        for cut in combinations(range(rows.shape[1]), d):
+            at = np.flatnonzero(lengths > cut[-1])
+            if len(at) == 0:
+                continue
+            # Prefix before the first cut, then every stretch after a cut shifted down by the deletions before it
+            key = hashes[at, cut[0]].copy()
+            for t, (p, q) in enumerate(zip(cut, list(cut[1:]) + [None]), 1):
+                upper = hashes[at, lengths[at]] if q is None else hashes[at, q]
+                key += (upper - hashes[at, p + 1]) * np.uint64(pow(base_inv, t, 2**64))
+            if wildcard:
+                key += np.uint64(salt * (cut[0] + 1) % 2**64)
+            keys.append(key)
+            words.append(at)
+    return np.concatenate(keys), np.concatenate(words)
+
+
+def shared_pairs(keys, words):
+    '''RETURNS UNIQUE PAIRS (I < J) OF WORDS SHARING A KEY, WITHOUT COMPARING ALL PAIRS'''
+    import numpy as np
+    order = np.argsort(keys, kind='stable')
+    keys, words = keys[order], words[order]
+    # Every member of a group is paired with the members after it
+    new = np.r_[True, keys[1:] != keys[:-1]]
+    starts = np.flatnonzero(new)
+    group = np.cumsum(new) - 1
+    size = np.diff(np.r_[starts, len(keys)])
+    after = size[group] - (np.arange(len(keys)) - starts[group]) - 1
+    a = np.repeat(np.arange(len(keys)), after)
+    b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(after) - after, after)
+    i, j = np.minimum(words[a], words[b]), np.maximum(words[a], words[b])
+    # A word can share a key with itself (deleting either of two equal phonemes)
+    m = int(words.max()) + 1 if len(words) else 1
+    pairs = np.sort(i[i != j].astype(np.int64) * m + j[i != j])
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+    return pairs // m, pairs % m
+
+
+def edit_distance(rows_a, len_a, rows_b, len_b, k=None):
+    '''RETURNS PHONEME EDIT DISTANCES OF PAIRS OF ROWS (ONE VECTORIZED LEVENSHTEIN TABLE FOR ALL PAIRS)
+
+    Only the 2k + 1 diagonals around the main one are filled (all of them without k), so distances above k are
+    returned as k + 1. Diagonal d holds the cells (i, i + d) of the current row of every pair's table.
+    '''
+    import numpy as np
+    width = max(int(len_a.max()), int(len_b.max())) if len(len_a) else 0
+    k = width if k is None else k
+    cap = min(k + 1, 127)
+    # Codes column by column (b padded so that every diagonal can be compared)
+    cols_a = np.ascontiguousarray(rows_a.T)
+    cols_b = np.ascontiguousarray(np.pad(rows_b, ((0, 0), (0, max(0, width + k + 1 - rows_b.shape[1])))).T)
+    diags = range(-k, k + 1)
+    prev = [np.full(len(len_a), min(d, cap) if d >= 0 else cap, dtype=np.int8) for d in diags]
+    out = np.where(len_a == 0, np.minimum(len_b, cap), cap).astype(np.int8)
+    for i in range(1, width + 1):
+        cur = []
+        for d in diags:
+            j = i + d
+            if j < 0:
+                cur.append(np.full(len(len_a), cap, dtype=np.int8))
+                continue
+            if j == 0:
+                cur.append(np.full(len(len_a), min(i, cap), dtype=np.int8))
+                continue
+            cell = prev[d + k] + (cols_a[i-1] != cols_b[j-1])
+            if d + k + 1 < len(prev):
+                np.minimum(cell, prev[d + k + 1] + 1, out=cell)
+            if cur:
+                np.minimum(cell, cur[-1] + 1, out=cell)
+            cur.append(np.minimum(cell, cap, out=cell))
+        # Distances of pairs whose first row ends here
+        at = np.flatnonzero(len_a == i)
+        d = len_b[at] - i
+        inside = np.abs(d) <= k
+        out[at[inside]] = np.stack(cur)[d[inside] + k, at[inside]]
+        prev = cur
+    return out.astype(np.int32)
+
+
+def near_pairs(rows, lengths, k=1):
+    '''RETURNS PAIRS OF DISTINCT ROWS WITHIN PHONEME EDIT DISTANCE K, AND THEIR DISTANCES'''
+    import numpy as np
+    i, j = shared_pairs(*deletion_keys(rows, lengths, k))
+    close = np.abs(lengths[i] - lengths[j]) <= k
+    i, j = i[close], j[close]
+    dist = edit_distance(rows[i], lengths[i], rows[j], lengths[j], k)
+    keep = (dist > 0) & (dist <= k)
+    return i[keep], j[keep], dist[keep]
+
+
+def ipa_key(ipas):
+    '''RETURNS IPA WITHOUT SYLLABLE AND WORD BOUNDARIES (EQUAL FOR EQUAL PHONEME SEQUENCES)'''
+    return ipas.fillna('').str.replace('[{}]'.format(''.join(boundaries)), '', regex=True)
+
+
+def homophones(lex):
+    '''RETURNS TABLE OF ENTRIES SHARING THEIR PHONEMES (IPA, ORTHOGRAPHIES, COUNT)'''
+    lex = lex.assign(Key=ipa_key(lex['IPA']))
+    lex = lex[lex['Key'] != '']
+    groups = lex[lex['Key'].duplicated(keep=False)].groupby('Key', sort=True)
+    return groups.agg(IPA=('IPA', 'first'), Orthography=('Orthography', ', '.join),
+                      Count=('Orthography', 'size')).reset_index(drop=True)
+
+
+def mergers(evolex):
+    '''RETURNS TABLE OF EVOLVED FORMS THAT DISTINCT ORIGINAL FORMS MERGED INTO'''
+    evolex = evolex.assign(Key=ipa_key(evolex['IPA']), OGKey=ipa_key(evolex['OG IPA']))
+    evolex = evolex[evolex['Key'] != '']
+    merged = evolex.groupby('Key')['OGKey'].transform('nunique') > 1
+    groups = evolex[merged].groupby('Key', sort=True)
+    return groups.agg(IPA=('IPA', 'first'), Orthography=('Orthography', 'first'),
+                      Sources=('OG Ortho', ', '.join), Count=('OGKey', 'nunique')).reset_index(drop=True)
+
+
+def near_homophones(lex, k=1, lang='IS'):
+    '''RETURNS TABLE OF PAIRS OF DISTINCT PHONEME SEQUENCES WITHIN EDIT DISTANCE K (ONE ENTRY PER SEQUENCE)'''
+    import numpy as np
+    import pandas as pd
+    lex = lex.assign(Key=ipa_key(lex['IPA']))
+    lex = lex[lex['Key'] != ''].drop_duplicates('Key')
+    rows, lengths, inventory = phoneme_rows(lex['IPA'].tolist(), lang)
+    i, j, dist = near_pairs(rows, lengths, k)
+    order = np.lexsort((j, i, dist))
+    i, j, dist = i[order], j[order], dist[order]
+    ortho, ipa = lex['Orthography'].to_numpy(), lex['IPA'].to_numpy()
+    return pd.DataFrame({'Orthography' : ortho[i], 'IPA' : ipa[i], 'Neighbour' : ortho[j], 'Neighbour IPA' : ipa[j],
+                         'Distance' : dist})
+
+
+#-------------------------------------------------------------------------------
+# MINIMAL PAIRS
+#-------------------------------------------------------------------------------
+def minimal_pairs(rows, lengths):
+    '''RETURNS PAIRS OF DISTINCT ROWS DIFFERING IN EXACTLY ONE PHONEME, AND THE POSITION OF THAT PHONEME'''
+    i, j = shared_pairs(*deletion_keys(rows, lengths, wildcard=True))
+    # Rows sharing a wildcard key differ in that position only (unless their hashes collide)
+    diff = rows[i] != rows[j]
+    keep = (lengths[i] == lengths[j]) & (diff.sum(axis=1) == 1)
+    return i[keep], j[keep], diff[keep].argmax(axis=1)
+
+
+def contrast_pairs(ipas, lang='IS'):
+    '''RETURNS MINIMAL PAIRS (INDICES INTO DISTINCT IPA INPUTS) AND THEIR CONTRAST LABELS, E.G. ɪ/i'''
+    import numpy as np
+    rows, lengths, inventory = phoneme_rows(ipas, lang)
+    i, j, pos = minimal_pairs(rows, lengths)
+    a, b = rows[i, pos], rows[j, pos]
+    # Contrasts are labelled in inventory order, so every contrast has one label
+    segments = np.array(inventory.segments, dtype=object)
+    labels = segments[np.minimum(a, b)] + '/' + segments[np.maximum(a, b)]
+    return i, j, labels
+
+
+def distinct(lex, column='IPA'):
+    '''RETURNS ENTRIES WITH DISTINCT PHONEME SEQUENCES (FIRST ENTRY OF EVERY SEQUENCE)'''
+    lex = lex.assign(Key=ipa_key(lex[column]))
+    return lex[lex['Key'] != ''].drop_duplicates('Key')
+
+
+def contrast_counts(ipas, lang='IS'):
+    '''RETURNS SERIES OF NUMBER OF MINIMAL PAIRS PER CONTRAST OF IPA INPUTS'''
+    import pandas as pd
+    ipas = pd.Series(list(ipas), dtype=object)
+    ipas = ipas[~ipa_key(ipas).duplicated() & (ipa_key(ipas) != '')]
+    i, j, labels = contrast_pairs(ipas.tolist(), lang)
+    return pd.Series(labels, dtype=object).value_counts().rename('Pairs')
+
+
+def contrasts(lex, examples=3, lang='IS'):
+    '''RETURNS TABLE OF MINIMAL PAIRS PER CONTRAST (CONTRAST, PAIRS, FIRST EXAMPLES), MOST FREQUENT FIRST'''
+    import pandas as pd
+    lex = distinct(lex)
+    i, j, labels = contrast_pairs(lex['IPA'].tolist(), lang)
+    ortho = lex['Orthography'].to_numpy()
+    pairs = pd.DataFrame({'Contrast' : labels, 'Example' : ortho[i] + ' ~ ' + ortho[j]})
+    table = pairs.groupby('Contrast').agg(Pairs=('Example', 'size'),
+                                          Examples=('Example', lambda ex: ', '.join(ex.iloc[:examples])))
+    return table.sort_values('Pairs', ascending=False, kind='stable').reset_index()
+
+
+def contrast_sweep(orthos, age_i=0, age_f=99, lang='IS'):
+    '''RETURNS TABLE OF MINIMAL PAIRS AND CONTRASTS AFTER EVERY SOUND CHANGE, WITH THE CONTRASTS IT LOST AND GAINED'''
+    import pandas as pd
+    orthos = [ortho for ortho in orthos if isinstance(ortho, str)]
+    prev = contrast_counts(trans_ipa_many(orthos, lang), lang)
+    out = [{'Rule' : '', 'Age' : '', 'Minimal Pairs' : prev.sum(), 'Contrasts' : len(prev), 'Lost' : '', 'Gained' : ''}]
+    # Rules sharing an id are one sound change, applied to the whole (newline separated) word list at once
+    text = '\n'.join(orthos)
+    for rule_id, rules in groupby(get_evolver(lang).rules, key=lambda rule: rule.id):
+        rules = [rule for rule in rules if age_i <= rule.age <= age_f]
+        if not rules:
+            continue
+        for rule in rules:
+            text = rule.apply(text)
+        counts = contrast_counts(trans_ipa_many(text.split('\n'), lang), lang)
+        out.append({'Rule' : rule_id, 'Age' : rules[0].age, 'Minimal Pairs' : counts.sum(), 'Contrasts' : len(counts),
+                    'Lost' : ', '.join(sorted(set(prev.index) - set(counts.index))),
+                    'Gained' : ', '.join(sorted(set(counts.index) - set(prev.index)))})
+        prev = counts
+    return pd.DataFrame(out)
@@ -0,0 +1,366 @@
+# Imports
+from conlang import ipa_dic
+from collation import alphabet
+# External (numpy, pandas) are imported by the functions that need them
+
+# Vowels (first character of a segment), length and palatalisation marks (attach to the preceding segment)
+vowels = 'ɑaiɔoɛeuɪʊ'
+modifiers = 'ːʲ'
+# Syllable boundaries, the first codes of every inventory (words are separated by newlines)
+boundaries = ['.', ' ', '\t']
+# Positions of a segment in its syllable
+positions = ['Onset', 'Nucleus', 'Coda']
+
+
+def ipa_inventory(lang='IS'):
+    '''RETURNS LIST OF SEGMENTS TRANS_IPA EMITS (TABLE OUTPUTS AND THE LETTERS IT PASSES THROUGH), SORTED'''
+    if lang.upper() not in ipa_dic:
+        raise ValueError('Language not recognised.')
+    table = ipa_dic[lang.upper()]
+    segs = [ipa for graph, ipa in table['digraphs']] + [ipa for ipa in table['chars'].values() if ipa]
+    segs += [ipa for rule, ipa in table['rules'] if ipa not in modifiers]
+    # Letters without a character rule of their own are their own IPA
+    segs += [char for char in 'abcdefghijklmnopqrstuvwxyz' if char not in table['chars']]
+    return sorted(set(segs))
+
+
+#-------------------------------------------------------------------------------
+# INVENTORY
+#-------------------------------------------------------------------------------
+class Inventory:
+    '''SEGMENTS OF A LANGUAGE AND THEIR UINT8 CODES (BOUNDARIES FIRST, UNSEEN SEGMENTS APPENDED ON ENCODING)'''
+
+    def __init__(self, segments, modifiers=''):
+        self.segments = []
+        self.code = {}
+        self.modifiers = modifiers
+        for seg in boundaries + list(segments):
+            self.add(seg)
+        # Character pairs that form one segment (affricates, diphthongs and digraphs)
+        self.pairs = set(seg[:2] for seg in self.segments if len(seg.rstrip(modifiers)) == 2)
+
+    def __len__(self):
+        return len(self.segments)
+
+    def add(self, seg):
+        '''RETURNS CODE OF SEGMENT, ADDING IT IF UNSEEN'''
+        if seg not in self.code:
+            if len(self.segments) > 255:
+                raise ValueError('Phoneme inventory full.')
+            self.code[seg] = len(self.segments)
+            self.segments.append(seg)
+        return self.code[seg]
+
+    def copy(self):
+        '''RETURNS INVENTORY WITH THE SAME CODES (SEGMENTS ADDED TO IT DO NOT CHANGE THIS ONE)'''
+        inventory = Inventory.__new__(Inventory)
+        inventory.segments = list(self.segments)
+        inventory.code = dict(self.code)
+        inventory.modifiers = self.modifiers
+        inventory.pairs = self.pairs
+        return inventory
+
+    def vowels(self):
+        '''RETURNS WHETHER EVERY CODE IS A VOWEL'''
+        import numpy as np
+        return np.array([seg[0] in vowels for seg in self.segments], dtype=bool)
+
+
+def pack(seg):
+    '''RETURNS INTEGER KEYS OF SEGMENT (THREE CODE POINTS PER KEY, 21 BITS EACH)'''
+    keys = []
+    for i in range(0, max(len(seg), 1), 3):
+        keys.append(sum(ord(char) << (21 * j) for j, char in enumerate(seg[i:i+3])))
+    return keys
+
+
+def unpack(keys):
+    '''RETURNS SEGMENT OF INTEGER KEYS'''
+    chars = []
+    for key in keys:
+        key = int(key)
+        while key:
+            chars.append(chr(key & 0x1FFFFF))
+            key >>= 21
+    return ''.join(chars)
+
+
+# Inventory cache (per language and script, known segments only)
+inventories = {}
+
+
+def get_inventory(lang='IS', script='ipa'):
+    '''RETURNS IPA OR ORTHOGRAPHIC INVENTORY OF LANGUAGE (A COPY OF THE CACHED ONE, SO UNSEEN SEGMENTS STAY IN ONE BATCH)'''
+    key = (lang.upper(), script)
+    if key not in inventories:
+        if script == 'ipa':
+            inventories[key] = Inventory(ipa_inventory(lang), modifiers)
+        elif script == 'ortho':
+            inventories[key] = Inventory(alphabet)
+        else:
+            raise ValueError('Script not recognised, please use ipa or ortho.')
+    return inventories[key].copy()
+
+
+#-------------------------------------------------------------------------------
+# PACKED WORDS
+#-------------------------------------------------------------------------------
+class PackedWords:
+    '''WORDS AS ONE FLAT UINT8 BUFFER OF SEGMENT CODES (BOUNDARIES INCLUDED) PLUS WORD OFFSETS
+
+    Encoding joins all words into one array of code points and marks segment starts with vectorized rules mirroring
+    segment_ipa (pairs of the inventory are one segment, modifiers attach to the preceding segment), every segment
+    (up to three code points, packed 21 bits each) is then looked up in the inventory.
+    '''
+
+    def __init__(self, codes, offsets, inventory):
+        self.codes = codes
+        self.offsets = offsets
+        self.inventory = inventory
+
+    @classmethod
+    def from_words(cls, words, inventory):
+        '''RETURNS PACKED WORDS (EMPTY CELLS AS EMPTY WORDS)'''
+        words = words.tolist() if hasattr(words, 'tolist') else list(words)
+        try:
+            text = '\n'.join(words)
+        except TypeError:
+            text = '\n'.join(word if isinstance(word, str) else '' for word in words)
+        return cls.from_text(text + '\n' if words else '', inventory)
+
+    @classmethod
+    def from_text(cls, text, inventory):
+        '''RETURNS PACKED WORDS OF NEWLINE TERMINATED TEXT (ONE WORD PER LINE)'''
+        import numpy as np
+        cps = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        # Character classes, looked up per code point
+        table = np.zeros(max(int(cps.max()) if len(cps) else 0, 0x2FF) + 1, dtype=np.uint8)
+        table[[ord(pair[1]) for pair in inventory.pairs]] = 4
+        table[[ord(char) for char in inventory.modifiers]] = 3
+        table[[ord(char) for char in boundaries]] = 2
+        table[ord('\n')] = 1
+        flags = table[cps]
+        newline = flags == 1
+        after = np.r_[True, (flags[:-1] == 1) | (flags[:-1] == 2)] if len(cps) else newline
+        # Second characters of pairs (checked only where such a character occurs)
+        second = np.zeros(len(cps), dtype=bool)
+        cand = np.flatnonzero(flags[1:] == 4) + 1
+        pair_keys = cps[cand - 1].astype(np.int64) << 21 | cps[cand]
+        second[cand] = np.isin(pair_keys, [ord(pair[0]) << 21 | ord(pair[1]) for pair in inventory.pairs])
+        # Segment starts (a modifier only starts a segment right after a boundary, as in segment_ipa)
+        start = ~newline & ~second & ((flags != 3) | after)
+        starts = np.flatnonzero(start)
+        # Segments packed into rows of integer keys, one column per three code points (the few characters continuing
+        # a segment are added sparsely, longer segments only widen the rows)
+        conts = np.flatnonzero(~start & ~newline)
+        segs = np.searchsorted(starts, conts, side='right') - 1
+        offsets = conts - starts[segs]
+        length = int(offsets.max()) + 1 if len(conts) else 1
+        keys = np.zeros((len(starts), (length + 2) // 3), dtype=np.int64)
+        keys[:, 0] = cps[starts]
+        for offset in range(1, length):
+            at = offsets == offset
+            keys[segs[at], offset // 3] |= cps[conts[at]].astype(np.int64) << (21 * (offset % 3))
+        # Inventory codes (unseen segments are added in order of appearance), rows compared as raw bytes
+        rows = keys[:, 0] if keys.shape[1] == 1 else keys.view(np.dtype((np.void, keys.itemsize * keys.shape[1])))
+        uniq, first, inverse = np.unique(rows.ravel(), return_index=True, return_inverse=True)
+        segments = [unpack(keys[i]) for i in first]
+        for i in np.argsort(first, kind='stable'):
+            inventory.add(segments[i])
+        codes = np.array([inventory.code[seg] for seg in segments], dtype=np.uint8)[inverse.ravel()]
+        # Word offsets (segments before every newline)
+        ends = np.cumsum(start, dtype=np.int64)[newline]
+        dtype = np.uint32 if len(codes) < 2**32 else np.int64
+        return cls(codes, np.r_[0, ends].astype(dtype), inventory)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        segments = self.inventory.segments
+        return ''.join(segments[code] for code in self.codes[self.offsets[i]:self.offsets[i+1]])
+
+    @property
+    def nbytes(self):
+        '''RETURNS SIZE OF CODES AND OFFSETS IN BYTES'''
+        return self.codes.nbytes + self.offsets.nbytes
+
+    def text(self):
+        '''RETURNS WORDS AS NEWLINE TERMINATED TEXT'''
+        import numpy as np
+        segments = np.array(self.inventory.segments + ['\n'], dtype=object)
+        idx = np.insert(self.codes.astype(np.int32), self.offsets[1:].astype(np.int64), len(self.inventory))
+        return ''.join(segments[idx])
+
+    def tolist(self):
+        '''RETURNS LIST OF WORDS'''
+        return self.text()[:-1].split('\n') if len(self) else []
+
+
+#-------------------------------------------------------------------------------
+# STATISTICS
+#-------------------------------------------------------------------------------
+class Segmentation:
+    '''PHONEME CODES OF PACKED IPA WITHOUT BOUNDARIES, WITH THE WORD AND SYLLABLE OF EVERY SEGMENT'''
+
+    def __init__(self, ipas, lang='IS'):
+        import numpy as np
+        packed = ipas if isinstance(ipas, PackedWords) else PackedWords.from_words(ipas, get_inventory(lang))
+        codes = packed.codes
+        lengths = np.diff(packed.offsets.astype(np.int64))
+        # A syllable starts after every boundary and at the start of every (non-empty) word
+        boundary = codes < len(boundaries)
+        new = boundary.copy()
+        new[packed.offsets[:-1][lengths > 0].astype(np.int64)] = True
+        keep = ~boundary
+        self.inventory = packed.inventory.segments
+        self.codes = codes[keep].astype(np.int32)
+        self.word = np.repeat(np.arange(len(packed), dtype=np.int32), lengths)[keep]
+        self.syll = np.cumsum(new, dtype=np.int32)[keep]
+        self.words = len(packed)
+        self.vowel = packed.inventory.vowels()
+
+    def positions(self):
+        '''RETURNS POSITION OF EVERY SEGMENT IN ITS SYLLABLE (0 ONSET, 1 NUCLEUS, 2 CODA)'''
+        import numpy as np
+        vowel = self.vowel[self.codes]
+        # Vowels seen so far in the syllable, counted from its first segment
+        seen = np.cumsum(vowel, dtype=np.int32)
+        first = self.firsts()
+        before = (seen - vowel)[first][np.cumsum(first, dtype=np.int32) - 1]
+        return np.where(vowel, 1, np.where(seen - before > 0, 2, 0))
+
+    def firsts(self):
+        '''RETURNS WHETHER EVERY SEGMENT IS THE FIRST OF ITS SYLLABLE'''
+        import numpy as np
+        return np.r_[True, self.syll[1:] != self.syll[:-1]] if len(self.syll) else np.zeros(0, dtype=bool)
+
+
+def phoneme_stats(ipas, lang='IS'):
+    '''RETURNS DICTIONARY OF PHONEME FREQUENCIES, POSITIONS, BIGRAMS, SYLLABLE STRUCTURES AND WORD LENGTHS'''
+    import numpy as np
+    import pandas as pd
+    seg = Segmentation(ipas, lang)
+    k = len(seg.inventory)
+    codes = seg.codes
+    # Boundaries are left out of the tables
+    nb = len(boundaries)
+    names = seg.inventory[nb:]
+    # Frequencies
+    freq = pd.Series(np.bincount(codes, minlength=k)[nb:], index=names, name='Count')
+    # Positions in the syllable
+    pos = seg.positions()
+    posc = np.bincount(codes * 3 + pos, minlength=3 * k).reshape(k, 3)
+    position = pd.DataFrame(posc[nb:], index=names, columns=positions)
+    # Bigrams within words
+    same = seg.word[1:] == seg.word[:-1]
+    bigc = np.bincount(codes[:-1][same] * k + codes[1:][same], minlength=k * k).reshape(k, k)
+    bigrams = pd.DataFrame(bigc[nb:, nb:], index=names, columns=names)
+    # Syllable structure (onsets, nuclei and codas per syllable, as a C/V pattern)
+    first = seg.firsts()
+    syll_of = np.cumsum(first, dtype=np.int32) - 1
+    shape = np.bincount(syll_of * 3 + pos, minlength=3 * first.sum()).reshape(-1, 3)
+    shape = np.minimum(shape, 9)
+    shapes, counts = np.unique(shape[:, 0] * 100 + shape[:, 1] * 10 + shape[:, 2], return_counts=True)
+    structure = pd.Series(counts, index=['C' * (s // 100) + 'V' * (s // 10 % 10) + 'C' * (s % 10) for s in shapes],
+                          name='Count').sort_values(ascending=False)
+    # Word lengths (in segments) and syllables per word
+    lengths = np.bincount(seg.word, minlength=seg.words)
+    syllables = np.bincount(seg.word[first], minlength=seg.words)
+    return {'frequency' : freq.sort_values(ascending=False), 'position' : position, 'bigrams' : bigrams,
+            'structure' : structure, 'lengths' : lengths, 'syllables' : syllables}
+
+
+#-------------------------------------------------------------------------------
+# SYLLABLES
+#-------------------------------------------------------------------------------
+# One row per syllable, spans are [start, end) positions in the packed code buffer, weights are 0 (light), 1 (closed)
+# or 2 (long: a length mark or /i/, as in find_stress)
+syllable_dtype = [('word', 'i4'), ('syllable', 'i2'), ('onset', 'i8', (2,)), ('nucleus', 'i8', (2,)),
+                  ('coda', 'i8', (2,)), ('weight', 'u1'), ('stressed', '?')]
+
+
+class Syllables:
+    '''SYLLABLES OF A WHOLE LEXICON AS ONE STRUCTURED ARRAY (WORD, SYLLABLE, ONSET/NUCLEUS/CODA SPANS, WEIGHT, STRESS)
+
+    Syllables are split on '.' only, as in find_stress, so every word has one syllable more than it has dots (empty
+    syllables have empty spans). The nucleus runs from the first to the last vowel of a syllable, a syllable without
+    vowels is all onset.
+    '''
+
+    def __init__(self, ipas, lang='IS'):
+        import numpy as np
+        if lang.upper() != 'IS':
+            raise ValueError('Language not recognised.')
+        packed = ipas if isinstance(ipas, PackedWords) else PackedWords.from_words(ipas, get_inventory(lang))
+        codes = packed.codes
+        offsets = packed.offsets.astype(np.int64)
+        n = len(packed)
+        self.packed = packed
+        if n == 0:
+            self.table = np.zeros(0, dtype=syllable_dtype)
+            self.count = np.zeros(0, dtype=np.int64)
+            self.stresses = np.zeros(0, dtype=np.int8)
+            return
+        # Syllable bounds (every dot ends a syllable, every word end ends its last one)
+        dots = np.flatnonzero(codes == 0)
+        dot_word = np.searchsorted(offsets, dots, side='right') - 1
+        count = 1 + np.bincount(dot_word, minlength=n)
+        ends = np.concatenate([dots, offsets[1:]])
+        word = np.concatenate([dot_word, np.arange(n)])
+        order = np.lexsort((ends, word))
+        ends, word = ends[order], word[order]
+        last = np.cumsum(count) - 1
+        first = np.zeros(len(ends), dtype=bool)
+        first[last - count + 1] = True
+        starts = np.where(first, offsets[:-1][word], np.r_[0, ends[:-1] + 1])
+        # Syllable of every code (empty syllables hold no codes)
+        syll_of = np.searchsorted(starts, np.arange(len(codes)), side='right') - 1
+        # Nuclei from the first to the last vowel (syllables without vowels end in an empty nucleus)
+        vidx = np.flatnonzero(packed.inventory.vowels()[codes])
+        vsyll = syll_of[vidx]
+        change = vsyll[1:] != vsyll[:-1]
+        nuc_start, nuc_end = ends.copy(), ends.copy()
+        if len(vidx):
+            nuc_start[vsyll[np.r_[True, change]]] = vidx[np.r_[True, change]]
+            nuc_end[vsyll[np.r_[change, True]]] = vidx[np.r_[change, True]] + 1
+        # Weights (long, closed or light)
+        long = np.array(['ː' in seg or 'i' in seg for seg in packed.inventory.segments], dtype=bool)
+        heavy = np.bincount(syll_of[long[codes]], minlength=len(ends)) > 0
+        weight = np.where(heavy, 2, np.where(ends > nuc_end, 1, 0))
+        # Stress on penultimate syllable, except for one syllable words or a long final syllable
+        stress = np.where((count == 1) | heavy[last], -1, -2).astype(np.int8)
+        table = np.zeros(len(ends), dtype=syllable_dtype)
+        table['word'] = word
+        table['syllable'] = np.arange(len(ends)) - (last - count + 1)[word]
+        table['onset'] = np.c_[starts, nuc_start]
+        table['nucleus'] = np.c_[nuc_start, nuc_end]
+        table['coda'] = np.c_[nuc_end, ends]
+        table['weight'] = weight
+        table['stressed'][last + 1 + stress] = True
+        self.table = table
+        self.count = count
+        self.stresses = stress
+
+    def __len__(self):
+        return len(self.table)
+
+    def stress(self):
+        '''RETURNS INDEX OF STRESSED SYLLABLE OF EVERY WORD (COUNTED FROM THE END, AS IN FIND_STRESS)'''
+        return self.stresses
+
+    def counts(self):
+        '''RETURNS NUMBER OF SYLLABLES OF EVERY WORD'''
+        return self.count
+
+    def spans(self, part):
+        '''RETURNS LENGTHS (IN SEGMENTS) OF ONSET, NUCLEUS OR CODA OF EVERY SYLLABLE'''
+        if part not in ['onset', 'nucleus', 'coda']:
+            raise ValueError('Syllable part not recognised, please use onset, nucleus or coda.')
+        return self.table[part][:, 1] - self.table[part][:, 0]
+
+    def violations(self, max_onset=2, max_coda=1):
+        '''RETURNS WHETHER EVERY WORD HAS A SYLLABLE WITHOUT NUCLEUS OR WITH TOO LONG AN ONSET OR CODA'''
+        import numpy as np
+        bad = (self.spans('nucleus') == 0) | (self.spans('onset') > max_onset) | (self.spans('coda') > max_coda)
+        return np.bincount(self.table['word'][bad], minlength=len(self.count)) > 0
@@ -0,0 +1,153 @@
+# Imports
+import argparse
+import io
+import json
+import string
+import sys
+from conlang import open_lexicon
+from collation import letter_groups
+# External (numpy) is only imported when run as a script
+
+
+# Field transforms, applied to whole lexicon columns at once ({Column|transform})
+transform_dic = {
+    'lower' : lambda col: col.str.lower(),
+    'nodot' : lambda col: col.str.replace('.', '', regex=False),
+    'int' : lambda col: col.astype(int),
+    'json' : lambda col: [json.dumps(None if val != val else val, ensure_ascii=False) for val in col.tolist()]
+}
+
+
+class Template:
+    '''PRECOMPILED TEMPLATE, STREAMING ROW TUPLES OF (SECTIONS OF) A LEXICON INTO A BUFFERED WRITER
+
+    The row template names its fields as {Column}, {Column|transform} or {Column|transform:spec}, these are compiled
+    once into a positional format string, so every entry is rendered by a single str.format call on a row tuple.
+    The section template takes the (quoted) section name as {0}, all other parts are literal text.
+    '''
+
+    def __init__(self, row, head='', foot='', section='', section_foot='', sep='', section_sep='',
+                 per_line=0, line_open='', line_close='', quote=str, encoding='utf-8'):
+        # Compile named fields into positional ones
+        self.fields = []
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(row):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+            if field not in self.fields:
+                self.fields.append(field)
+            parts.append('{' + str(self.fields.index(field)) + ('!' + conversion if conversion else '') +
+                         (':' + spec if spec else '') + '}')
+        self.row = ''.join(parts).format
+        self.head, self.foot, self.section, self.section_foot = head, foot, section, section_foot
+        self.sep, self.section_sep = sep, section_sep
+        self.per_line, self.line_open, self.line_close = per_line, line_open, line_close
+        self.quote = quote
+        # 'xml' writes ASCII with non-ASCII characters as character references
+        self.codec = ('ascii', 'xmlcharrefreplace') if encoding == 'xml' else (encoding, 'strict')
+
+    def columns(self, lex):
+        '''RETURNS (TRANSFORMED) COLUMNS OF LEXICON IN FIELD ORDER'''
+        cols = []
+        for field in self.fields:
+            column, _, transform = field.partition('|')
+            col = lex[column]
+            if transform:
+                if transform not in transform_dic:
+                    raise ValueError('Template transform not recognised.')
+                col = transform_dic[transform](col)
+            cols.append(col.tolist() if hasattr(col, 'tolist') else col)
+        return cols
+
+    def lines(self, lex):
+        '''RETURNS RENDERED ENTRIES OF LEXICON'''
+        cells = list(map(self.row, *self.columns(lex)))
+        if not self.per_line:
+            return self.sep.join(cells)
+        # Several entries per line, an incomplete last line is left open
+        k = self.per_line
+        return ''.join(self.line_open + ''.join(cells[i:i+k]) + (self.line_close if i + k <= len(cells) else '')
+                       for i in range(0, len(cells), k))
+
+    def stream(self, groups):
+        '''YIELDS RENDERED TEXT, ONE PIECE PER SECTION OF (NAME, SUB-LEXICON) GROUPS'''
+        yield self.head
+        for i, (name, lex) in enumerate(groups):
+            yield ((self.section_sep if i else '') + (self.section.format(self.quote(name)) if self.section else '') +
+                   self.lines(lex) + self.section_foot)
+        yield self.foot
+
+    def render(self, groups, out=None):
+        '''WRITES RENDERED GROUPS TO BINARY OUTPUT, OR RETURNS THEM AS BYTES'''
+        buf = io.BytesIO() if out is None else out
+        for text in self.stream(groups):
+            buf.write(text.encode(*self.codec))
+        if out is None:
+            return buf.getvalue()
+        out.flush()
+
+
+def stdout():
+    '''RETURNS BINARY STANDARD OUTPUT (AFTER FLUSHING PRINTED TEXT)'''
+    sys.stdout.flush()
+    return sys.stdout.buffer
+
+
+#-------------------------------------------------------------------------------
+# LEXICON TEMPLATES
+#-------------------------------------------------------------------------------
+# Lexicon per letter (targets)
+list_templates = {
+    'html' : Template('<td class="tg-73oq"><span style="font-weight:bold;color:#3166FF">{Orthography}</span> [{IPA}]<br>'
+                      '    <span style="font-style:italic">{Class}.</span> {Description|lower}</td>\n',
+                      head='<table class="tg" style="undefined;table-layout: fixed; width: 903px">\n<colgroup>\n'
+                           '<col style="width: 301px">\n<col style="width: 301px">\n<col style="width: 301px">\n'
+                           '</colgroup>\n<tbody>\n',
+                      section='<tr>\n<td class="tg-wp8o" colspan="3">{0}</td>\n</tr>\n',
+                      per_line=3, line_open='<tr>\n', line_close='</tr>\n',
+                      foot='</tbody>\n</table>\n'),
+    'latex' : Template(r'\entry {{{Orthography}}}{{[{IPA}]}}{{\pos {Class}. \definition {Description}}}' + '\n',
+                       section=r'\section*{{{0}}}' + '\n' + r'\begin{{multicols}}{{3}}' + '\n',
+                       section_foot=r'\end{multicols}' + '\n' + r'\needspace{15\baselineskip}' + '\n'),
+    'markdown' : Template('- **{Orthography}** [{IPA}] *{Class}.* {Description}\n',
+                          section='## {0}\n\n', section_sep='\n'),
+    'json' : Template('  {{"Orthography": {Orthography|json}, "IPA": {IPA|json}, "Class": {Class|json}, '
+                      '"Description": {Description|json}}}',
+                      head='{\n', section='{0}: [\n', sep=',\n', section_foot='\n]', section_sep=',\n', foot='\n}\n',
+                      quote=lambda name: json.dumps(name, ensure_ascii=False))
+}
+
+
+#-------------------------------------------------------------------------------
+# HLAAHU TEMPLATES
+#-------------------------------------------------------------------------------
+# Image of a parent in the origin column
+origin_image = '<img src="../img/hlaahu/{0:03}.png" alt="Image" width="60" height="60">'
+
+
+def origin_cells(genealogy, names):
+    '''RETURNS ORIGIN IMAGES OF EVERY HLAAHU NAME (UNRESOLVED PARENTS LEFT OUT)'''
+    return [''.join(origin_image.format(no) for no in nos if no is not None) for nos in genealogy.origins(names)]
+
+
+if __name__ == '__main__':
+    # Initialise Parser
+    parser = argparse.ArgumentParser(description='Lexicon Renderer')
+    parser.add_argument('type', type=str, action='store', metavar='lexicon', help='Lexicon to render: lex or evo')
+    parser.add_argument('-target', type=str, action='store', default='html',
+                        help='Output format: html, latex, markdown or json')
+    args = parser.parse_args()
+    # Import the correct lexicon from its compiled store
+    if args.type == 'lex':
+        lex, codes = open_lexicon('./data/iskeelis.tsv', 'IS', collation=True)
+    elif args.type == 'evo':
+        lex, codes = open_lexicon('./data/evolved.tsv', 'EVO', collation=True)
+    else:
+        raise ValueError('Type not recognised, please use lex or evo.')
+    if args.target not in list_templates:
+        raise ValueError('Target not recognised, please use html, latex, markdown or json.')
+    if args.target != 'json':
+        import numpy as np
+        lex = lex.replace(np.nan, ' ', regex=True)
+    list_templates[args.target].render(letter_groups(lex, codes=codes), stdout())
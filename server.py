@@ -0,0 +1,242 @@
+# Imports
+# Internal
+import asyncio
+import io
+import json
+import signal
+from urllib.parse import urlsplit, parse_qs
+# Library
+from conlang import (path_dic, schema_dic, lang_code, open_lexicon, read_lexicon, make_entry, append_tsv, save_tsv,
+                     trans_ipa, find_stress, evolver, SearchIndex)
+# External (pandas) is imported lazily by the lexicon state
+
+# Seconds between batched writes to disk
+flush_interval = 1.0
+# HTTP reason phrases
+status_dic = {200 : 'OK', 400 : 'Bad Request', 404 : 'Not Found', 405 : 'Method Not Allowed'}
+
+
+#-------------------------------------------------------------------------------
+# LEXICON STATE
+#-------------------------------------------------------------------------------
+class Lexicon:
+    '''IN-MEMORY LEXICON WITH ITS SEARCH INDEXES AND PENDING WRITES'''
+
+    def __init__(self, code):
+        self.code = code
+        self.path = path_dic[code]
+        self.lex = open_lexicon(self.path, code)
+        self.indexes = {}
+        self.pending = []
+        self.rewrite = False
+
+    def search(self, axis, search, match='sub'):
+        '''RETURNS ENTRIES WHOSE AXIS MATCHES SEARCH'''
+        if axis not in self.lex.columns:
+            raise ValueError('Search axis not recognised.')
+        if axis not in self.indexes:
+            self.indexes[axis] = SearchIndex(self.lex[axis])
+        return self.lex.iloc[self.indexes[axis].query(search, match, self.lex[axis])]
+
+    def add(self, entries):
+        '''ADDS ALL-IN-ONE ENTRIES, RETURNS THEIR DICTIONARIES'''
+        import pandas as pd
+        nes = [make_entry(self.path, entry) for entry in entries]
+        if nes:
+            # Parse new rows like the TSV so the column types stay the same
+            buf = io.BytesIO(pd.DataFrame(nes).to_csv(sep='\t', index=False).encode('utf-8'))
+            new = read_lexicon(buf, self.code)
+            # Replace (never mutate) the lexicon, so readers and writers can hold on to a snapshot
+            self.lex = pd.concat([self.lex, new], ignore_index=True).astype(schema_dic[self.code])
+            self.indexes = {}
+            self.pending += nes
+        return nes
+
+    def rem(self, id):
+        '''REMOVES ENTRY ACCORDING TO ID, RETURNS IT'''
+        if not 0 <= id < len(self.lex):
+            raise ValueError('Entry ID not recognised.')
+        row = self.lex.iloc[id]
+        self.lex = self.lex.drop(self.lex.index[id]).reset_index(drop=True)
+        self.indexes = {}
+        self.rewrite = True
+        return row
+
+    def take_write(self):
+        '''RETURNS (FUNCTION, ARGUMENTS) OF THE PENDING WRITE, OR NONE, AND CLEARS IT'''
+        if self.rewrite:
+            write = (save_tsv, self.lex, self.path)
+        elif self.pending:
+            write = (append_tsv, self.path, self.pending)
+        else:
+            write = None
+        self.pending = []
+        self.rewrite = False
+        return write
+
+
+#-------------------------------------------------------------------------------
+# SERVER
+#-------------------------------------------------------------------------------
+def records(lex):
+    '''RETURNS LEXICON AS LIST OF DICTIONARIES (WITH ENTRY ID)'''
+    return json.loads(lex.rename_axis('id').reset_index().to_json(orient='records', force_ascii=False))
+
+
+class LexiconServer:
+    '''ASYNCIO HTTP SERVER KEEPING LEXICONS, INDEXES AND RULE ENGINES WARM'''
+
+    def __init__(self, lang='IS'):
+        self.lang = lang
+        self.lexicons = {}
+        self.lock = asyncio.Lock()
+        self.routes = {
+            '/lst' : (['GET'], self.do_lst),
+            '/ipa' : (['GET'], self.do_ipa),
+            '/evo' : (['GET'], self.do_evo),
+            '/add' : (['POST'], self.do_add),
+            '/rem' : (['POST'], self.do_rem)
+        }
+
+    def lexicon(self, params):
+        '''RETURNS (LOADED) LEXICON OF REQUEST'''
+        code = lang_code(params.get('lang', [self.lang])[-1])
+        if code not in self.lexicons:
+            self.lexicons[code] = Lexicon(code)
+        return self.lexicons[code]
+
+    def do_lst(self, params, body):
+        '''RETURNS (RANDOM) ENTRIES ACCORDING TO SEARCH'''
+        lexicon = self.lexicon(params)
+        axis = params.get('ax', [''])[-1]
+        search = params.get('ser', [''])[-1]
+        ran_num = int(params.get('ran', [0])[-1])
+        plex = lexicon.search(axis, search, params.get('match', ['sub'])[-1]) if (axis and search) else lexicon.lex
+        if ran_num > 0:
+            plex = plex.sample(n=min(ran_num, len(plex)))
+        return records(plex)
+
+    def do_ipa(self, params, body):
+        '''RETURNS IPA AND STRESS OF ORTHOGRAPHIC INPUTS'''
+        lang = lang_code(params.get('lang', [self.lang])[-1])
+        out = []
+        for ortho in params.get('ortho', []):
+            ipa = trans_ipa(ortho, lang)
+            out.append({'Orthography' : ortho, 'IPA' : ipa, 'Stress' : find_stress(ipa, lang)})
+        return out
+
+    def do_evo(self, params, body):
+        '''RETURNS EVOLVED ENTRIES'''
+        lang = lang_code(params.get('lang', [self.lang])[-1])
+        age_i = int(params.get('i', [0])[-1])
+        age_f = int(params.get('f', [99])[-1])
+        out = []
+        for entry in params.get('entry', []):
+            new = evolver(entry, age_i, age_f, lang=lang)
+            ipa_new = trans_ipa(new, lang)
+            out.append({
+                'Orthography' : new,
+                'IPA' : ipa_new,
+                'Stress' : find_stress(ipa_new, lang),
+                'Age' : age_i,
+                'Changed' : new != entry,
+                'OG IPA' : trans_ipa(entry, lang),
+                'OG Ortho' : entry
+            })
+        return out
+
+    def do_add(self, params, body):
+        '''ADDS ENTRIES (PARAMETERS AND BODY LINES), WRITTEN TO DISK WITH THE NEXT BATCH'''
+        entries = params.get('entry', []) + [line for line in body.splitlines() if line.strip()]
+        return self.lexicon(params).add(entries)
+
+    def do_rem(self, params, body):
+        '''REMOVES ENTRY ACCORDING TO ID, WRITTEN TO DISK WITH THE NEXT BATCH'''
+        row = self.lexicon(params).rem(int(params.get('id', [-1])[-1]))
+        return json.loads(row.to_json(force_ascii=False))
+
+    def dispatch(self, method, target, body):
+        '''RETURNS STATUS AND RESULT OF REQUEST'''
+        url = urlsplit(target)
+        if url.path not in self.routes:
+            return 404, {'error' : 'Action mode not recognised.'}
+        methods, handler = self.routes[url.path]
+        if method not in methods:
+            return 405, {'error' : 'Use {} for {}.'.format(' or '.join(methods), url.path)}
+        try:
+            return 200, handler(parse_qs(url.query), body)
+        except (ValueError, KeyError, IndexError) as e:
+            return 400, {'error' : str(e)}
+
+    async def handle(self, reader, writer):
+        '''SERVES REQUESTS OF ONE (KEEP-ALIVE) CONNECTION'''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, version = line.decode('utf-8').split()
+                # Headers and body
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, val = header.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = val.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                # Response
+                status, result = self.dispatch(method, target, body.decode('utf-8'))
+                payload = json.dumps(result, ensure_ascii=False).encode('utf-8')
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json; charset=utf-8\r\n'
+                             'Content-Length: {}\r\nConnection: {}\r\n\r\n'
+                             .format(status, status_dic[status], len(payload), 'close' if close else 'keep-alive')
+                             .encode('latin-1') + payload)
+                await writer.drain()
+                if close:
+                    break
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def flush(self):
+        '''WRITES PENDING CHANGES TO DISK, OFF THE EVENT LOOP SO READS ARE NOT BLOCKED'''
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            for lexicon in list(self.lexicons.values()):
+                write = lexicon.take_write()
+                if write is not None:
+                    await loop.run_in_executor(None, *write)
+
+    async def flusher(self):
+        '''FLUSHES PENDING CHANGES EVERY FLUSH INTERVAL'''
+        while True:
+            await asyncio.sleep(flush_interval)
+            await self.flush()
+
+    async def run(self, host='127.0.0.1', port=8080):
+        '''SERVES UNTIL INTERRUPTED, FLUSHING PENDING CHANGES ON EXIT'''
+        server = await asyncio.start_server(self.handle, host, port)
+        print('Serving lexicons on http://{}:{}/ (lst, ipa, evo, add, rem)'.format(host, port))
+        flusher = asyncio.create_task(self.flusher())
+        # Stop (and flush) on SIGTERM as well as on interrupt, where the platform allows it
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, AttributeError):
+            pass
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.flush()
+
+
+def serve(lang='IS', host='127.0.0.1', port=8080):
+    '''RUNS LEXICON SERVER'''
+    try:
+        asyncio.run(LexiconServer(lang).run(host, port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print('\nServer stopped, pending changes written.')